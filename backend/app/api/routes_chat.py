@@ -1,46 +1,104 @@
 # app/api/routes_chat.py (Updated with LangSmith Tracing)
-from fastapi import APIRouter, HTTPException, Depends, Request, Query
-from typing import Optional, List
-import uuid
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, Query
+from typing import Optional
+import asyncio
+import secrets
 import time
 
 from app.models.request_models import ChatRequest
 from app.models.response_models import (
-    ChatResponse, ChatHistoryRequest, ChatHistoryResponse, 
-    SessionInfo, SearchResponse
+    ChatResponse, ChatHistoryRequest, 
+    SearchResponse
 )
-from app.core.orchestrator import chat_pipeline, search_documents
-from app.services.auth_service import get_current_user
+from app.core.orchestrator import chat_pipeline, search_documents, invalidate_kb_cache
+from app.config import settings
+from app.services.auth_service import get_current_user, create_session_id, get_session_owner
 from app.services.memory_service import memory_service
 from app.services.langsmith_service import langsmith_service
 from app.core.error_handler import ValidationError, KnowledgeBaseError
 from app.core.logging_config import LoggingConfig
 from loguru import logger
 
-from fastapi.responses import StreamingResponse
-import json
+from fastapi.responses import StreamingResponse, ORJSONResponse
+import orjson
+from types import MappingProxyType
+from functools import lru_cache
 
 router = APIRouter()
+# Test and diagnostics routes, only mounted when DEBUG is enabled
+debug_router = APIRouter()
 import os
 
-@router.get("/debug/langsmith")
-@langsmith_service.trace(
-    name="debug_langsmith_config",
-    run_type="tool",
-    metadata={"endpoint": "/debug/langsmith"}
+MAX_QUERY_LENGTH = 10000
+
+# Upper bounds for coalescing already-available chunks into one SSE write
+SSE_BATCH_MAX_FRAMES = 16
+SSE_BATCH_MAX_BYTES = 8192
+SSE_TERMINAL_TYPES = ("complete", "error")
+
+# Caps how long a single /test-streaming request can hold the stream open
+TEST_STREAM_MAX_DELAY = 1.0
+
+_SSE_HEADERS = MappingProxyType({
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Cache-Control"
+})
+
+# Hot-path tracers, built once with frozen metadata
+_TRACE_CHAT = langsmith_service.trace(
+    name="chat_endpoint",
+    run_type="chain",
+    metadata=MappingProxyType({"endpoint": "/chat", "streaming_support": True})
 )
-async def debug_langsmith(
-    fastapi_request: Request,
-    current_user: str = Depends(get_current_user)
-):
-    """Debug LangSmith configuration"""
-    from app.config import settings
+_TRACE_STREAM = langsmith_service.trace(
+    name="generate_streaming_response",
+    run_type="chain",
+    metadata=MappingProxyType({"response_type": "sse"})
+)
+
+def _get_owned_session(session_id: str, current_user: str):
+    """Resolve a session the caller owns, raising 403/404 otherwise"""
+    # Signed ids carry their owner, so foreign sessions are rejected without a lookup
+    owner = get_session_owner(session_id)
+    if owner is not None and owner != current_user:
+        raise HTTPException(status_code=403, detail="Access denied to this session")
     
-    return {
-        "langsmith_service": {
-            "enabled": langsmith_service.enabled,
-            "client_exists": langsmith_service.client is not None,
-        },
+    session = memory_service.sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    # Unsigned ids from before signing was introduced still need the stored owner
+    if owner is None and session.user_id != current_user:
+        raise HTTPException(status_code=403, detail="Access denied to this session")
+    
+    return session
+
+
+_AVAILABLE_ENDPOINTS = (
+    "/v1/chat",
+    "/v1/search",
+    "/v1/kb/health",
+    "/v1/stats",
+    "/v1/chat/history/{session_id}",
+    "/v1/chat/session/{session_id}",
+    "/v1/chat/sessions",
+) + (("/v1/test-sessions", "/v1/test-streaming") if settings.DEBUG else ())
+
+_DEBUG_INSTRUCTIONS = MappingProxyType({
+    "1": "Ensure LANGCHAIN_TRACING_V2=true in your .env file",
+    "2": "Ensure LANGCHAIN_API_KEY is set with your key from https://smith.langchain.com",
+    "3": "Restart your FastAPI application after .env changes",
+    "4": "Make a request to /v1/chat",
+    "5": "Check traces at https://smith.langchain.com/projects"
+})
+
+
+@lru_cache(maxsize=1)
+def _langsmith_config_snapshot() -> MappingProxyType:
+    """Settings and env vars only change on restart, so read them once"""
+    return MappingProxyType({
         "settings": {
             "langsmith_enabled": settings.LANGCHAIN_TRACING_V2,
             "api_key_set": bool(settings.LANGCHAIN_API_KEY),
@@ -54,21 +112,32 @@ async def debug_langsmith(
             "LANGCHAIN_PROJECT": os.getenv("LANGCHAIN_PROJECT"),
             "LANGCHAIN_ENDPOINT": os.getenv("LANGCHAIN_ENDPOINT"),
         },
-        "instructions": {
-            "1": "Ensure LANGCHAIN_TRACING_V2=true in your .env file",
-            "2": "Ensure LANGCHAIN_API_KEY is set with your key from https://smith.langchain.com",
-            "3": "Restart your FastAPI application after .env changes",
-            "4": "Make a request to /v1/chat",
-            "5": "Check traces at https://smith.langchain.com/projects"
-        }
-    }
+    })
 
-@router.post("/chat")
+
+@debug_router.get("/debug/langsmith")
 @langsmith_service.trace(
-    name="chat_endpoint",
-    run_type="chain",
-    metadata={"endpoint": "/chat", "streaming_support": True}
+    name="debug_langsmith_config",
+    run_type="tool",
+    metadata={"endpoint": "/debug/langsmith"},
+    sample_rate=0.0
 )
+async def debug_langsmith(
+    fastapi_request: Request,
+    current_user: str = Depends(get_current_user)
+):
+    """Debug LangSmith configuration"""
+    return {
+        "langsmith_service": {
+            "enabled": langsmith_service.enabled,
+            "client_exists": langsmith_service.client is not None,
+        },
+        **_langsmith_config_snapshot(),
+        "instructions": _DEBUG_INSTRUCTIONS
+    }
+
+@router.post("/chat")
+@_TRACE_CHAT
 async def chat_with_streaming(
     request: ChatRequest, 
     fastapi_request: Request,
@@ -77,31 +146,34 @@ async def chat_with_streaming(
     current_user: str = Depends(get_current_user)
 ):
     """Enhanced chat endpoint with optional streaming support"""
-    request_id = getattr(fastapi_request.state, 'request_id', str(uuid.uuid4()))
+    request_id = getattr(fastapi_request.state, 'request_id', None) or secrets.token_hex(16)
+    log = LoggingConfig.get_request_logger(fastapi_request)
     
     try:
-        if not request.query or len(request.query.strip()) == 0:
-            raise ValidationError("Query cannot be empty")
+        query = request.query
+        if len(query) > MAX_QUERY_LENGTH:
+            raise ValidationError(f"Query is too long (maximum {MAX_QUERY_LENGTH} characters)")
         
-        if len(request.query) > 10000:
-            raise ValidationError("Query is too long (maximum 10000 characters)")
+        if not query or query.isspace():
+            raise ValidationError("Query cannot be empty")
         
         if not request.user_id:
             request.user_id = current_user
         
         # Generate session ID if not provided
         if not session_id:
-            session_id = f"{current_user}_{str(uuid.uuid4())}"
-            logger.bind(request_id=request_id, user_id=current_user).info(
+            session_id = create_session_id(current_user)
+            log.info(
                 f"Generated new session ID: {session_id}"
             )
         else:
-            logger.bind(request_id=request_id, user_id=current_user).info(
+            log.info(
                 f"Using existing session ID: {session_id}"
             )
         
-        logger.bind(request_id=request_id, user_id=current_user, session_id=session_id).info(
-            f"Chat request received | User: {request.user_id} | Query length: {len(request.query)} | Streaming: {stream}"
+        log = log.bind(session_id=session_id)
+        log.info(
+            f"Chat request received | User: {request.user_id} | Query length: {len(query)} | Streaming: {stream}"
         )
         
         if stream:
@@ -109,12 +181,7 @@ async def chat_with_streaming(
             return StreamingResponse(
                 generate_streaming_response(request, request_id, current_user, session_id),
                 media_type="text/plain",
-                headers={
-                    "Cache-Control": "no-cache",
-                    "Connection": "keep-alive",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Cache-Control"
-                }
+                headers=_SSE_HEADERS
             )
         else:
             # Return regular response
@@ -130,19 +197,15 @@ async def chat_with_streaming(
             return result
         
     except ValidationError as e:
-        logger.bind(request_id=request_id, user_id=current_user).warning(f"Validation error: {str(e)}")
+        log.warning(f"Validation error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
     
     except Exception as e:
-        logger.bind(request_id=request_id, user_id=current_user).error(f"Unexpected error in chat endpoint: {str(e)}")
+        log.error(f"Unexpected error in chat endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@langsmith_service.trace(
-    name="generate_streaming_response",
-    run_type="chain",
-    metadata={"response_type": "sse"}
-)
+@_TRACE_STREAM
 async def generate_streaming_response(
     request: ChatRequest,
     request_id: str,
@@ -151,37 +214,84 @@ async def generate_streaming_response(
 ):
     """Generate Server-Sent Events for streaming chat response"""
     
-    try:
-        from app.core.orchestrator import chat_pipeline_streaming
-        
-        logger.bind(request_id=request_id, user_id=user_id, session_id=session_id).info(
-            "Starting streaming response generation"
-        )
-        
-        async for chunk_data in chat_pipeline_streaming(
+    from app.core.orchestrator import chat_pipeline_streaming
+    
+    log = logger.bind(request_id=request_id, user_id=user_id, session_id=session_id)
+    
+    # Bounded to one write batch, so a slow client holds the pipeline back
+    # instead of letting chunks pile up in memory
+    queue: asyncio.Queue = asyncio.Queue(maxsize=SSE_BATCH_MAX_FRAMES)
+    stream_end = object()
+    
+    async def pump_chunks():
+        source = chat_pipeline_streaming(
             request=request,
             request_id=request_id,
             user_id=user_id,
             session_id=session_id
-        ):
-            # Format as Server-Sent Events
-            sse_data = f"data: {json.dumps(chunk_data)}\n\n"
-            
-            logger.bind(request_id=request_id, user_id=user_id, session_id=session_id).debug(
-                f"Yielding SSE chunk: {chunk_data.get('type', 'unknown')}"
-            )
+        )
+        try:
+            async for chunk_data in source:
+                await queue.put(chunk_data)
+                if chunk_data.get("type") in SSE_TERMINAL_TYPES:
+                    break
+            await queue.put(stream_end)
+        except Exception as e:
+            await queue.put(e)
+        finally:
+            # Runs the pipeline's cleanup (closing the Bedrock stream) now, whether it
+            # stopped at a terminal event or the writer went away and cancelled us
+            await source.aclose()
+    
+    producer = None
+    try:
+        log.info(
+            "Starting streaming response generation"
+        )
+        
+        producer = asyncio.create_task(pump_chunks())
+        finished = False
+        frames = 0
+        
+        while not finished:
+            batch = []
+            batch_size = 0
+            chunk_data = await queue.get()
             
-            yield sse_data
+            # Drain whatever is already queued into a single write
+            while True:
+                if chunk_data is stream_end:
+                    finished = True
+                    break
+                if isinstance(chunk_data, Exception):
+                    if batch:
+                        yield b"".join(batch)
+                    raise chunk_data
+                
+                # Format as Server-Sent Events
+                sse_data = b"data: " + orjson.dumps(chunk_data) + b"\n\n"
+                batch.append(sse_data)
+                batch_size += len(sse_data)
+                # Counted rather than logged per frame; reported once at the end
+                frames += 1
+                
+                # Flush on completion or error
+                if chunk_data.get("type") in SSE_TERMINAL_TYPES:
+                    log.info(
+                        f"Streaming completed with type: {chunk_data.get('type')} | Frames: {frames}"
+                    )
+                    finished = True
+                    break
+                
+                if queue.empty() or len(batch) >= SSE_BATCH_MAX_FRAMES or batch_size >= SSE_BATCH_MAX_BYTES:
+                    break
+                chunk_data = queue.get_nowait()
             
-            # Break on completion or error
-            if chunk_data.get("type") in ["complete", "error"]:
-                logger.bind(request_id=request_id, user_id=user_id, session_id=session_id).info(
-                    f"Streaming completed with type: {chunk_data.get('type')}"
-                )
-                break
+            if batch:
+                yield b"".join(batch)
     
     except Exception as e:
-        logger.bind(request_id=request_id, user_id=user_id, session_id=session_id).error(
+        log.error(
             f"Error in streaming response: {str(e)}"
         )
         
@@ -191,50 +301,52 @@ async def generate_streaming_response(
             "content": f"Streaming error: {str(e)}",
             "session_id": session_id
         }
-        yield f"data: {json.dumps(error_data)}\n\n"
+        yield b"data: " + orjson.dumps(error_data) + b"\n\n"
+    
+    finally:
+        if producer is not None and not producer.done():
+            producer.cancel()
 
 
-@router.get("/test-streaming")
+@debug_router.get("/test-streaming")
 @langsmith_service.trace(
     name="test_streaming_endpoint",
     run_type="chain",
-    metadata={"endpoint": "/test-streaming", "test": True}
+    metadata={"endpoint": "/test-streaming", "test": True},
+    sample_rate=0.0
 )
 async def test_streaming_endpoint(
     fastapi_request: Request,
+    delay: float = Query(0.5, ge=0, le=TEST_STREAM_MAX_DELAY, description="Seconds between test chunks"),
     current_user: str = Depends(get_current_user)
 ):
     """Test streaming functionality"""
     
     async def test_stream():
         """Simple test stream"""
+        timestamp = time.time()
         for i in range(5):
             test_data = {
                 "type": "chunk" if i < 4 else "complete",
                 "content": f"Test chunk {i+1}/5: Hello from streaming! ",
                 "session_id": "test-session",
-                "timestamp": time.time()
+                "timestamp": timestamp
             }
             
-            yield f"data: {json.dumps(test_data)}\n\n"
+            yield b"data: " + orjson.dumps(test_data) + b"\n\n"
             
             # Small delay to simulate processing
-            import asyncio
-            await asyncio.sleep(0.5)
+            if delay and i < 4:
+                await asyncio.sleep(delay)
     
     return StreamingResponse(
         test_stream(),
         media_type="text/plain",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Cache-Control"
-        }
+        headers=_SSE_HEADERS
     )
 
 
-@router.get("/test-sessions")
+@debug_router.get("/test-sessions")
 @langsmith_service.trace(
     name="test_session_management",
     run_type="chain",
@@ -245,15 +357,16 @@ async def test_session_management(
     current_user: str = Depends(get_current_user)
 ):
     """Test endpoint for session management functionality"""
-    request_id = getattr(fastapi_request.state, 'request_id', str(uuid.uuid4()))
+    request_id = getattr(fastapi_request.state, 'request_id', None) or secrets.token_hex(16)
+    log = LoggingConfig.get_request_logger(fastapi_request)
     
     try:
-        logger.bind(request_id=request_id, user_id=current_user).info(
+        log.info(
             "Session management test started"
         )
         
         # Test 1: Create a new session
-        session_id = str(uuid.uuid4())
+        session_id = secrets.token_hex(16)
         test_results = {}
         
         logger.info(f"Testing session management with session_id: {session_id}")
@@ -320,7 +433,7 @@ async def test_session_management(
                 })
         
         # Test 7: Test with a new session (no context)
-        new_session_id = str(uuid.uuid4())
+        new_session_id = secrets.token_hex(16)
         
         request3 = ChatRequest(
             query="What rights are you referring to?",  # This should not make sense without context
@@ -352,7 +465,7 @@ async def test_session_management(
             "test_successful": len(memory_service.get_chat_history(session_id)) >= 4  # Should have 4+ messages
         }
         
-        logger.bind(request_id=request_id, user_id=current_user).info(
+        log.info(
             f"Session test completed successfully. Original session has {test_results['comparison']['original_session_messages']} messages"
         )
         
@@ -369,64 +482,57 @@ async def test_session_management(
         }
         
     except Exception as e:
-        logger.bind(request_id=request_id, user_id=current_user).error(f"Session test failed: {str(e)}")
+        log.error(f"Session test failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Session test failed: {str(e)}")
 
 
-@router.get("/chat/history/{session_id}", response_model=ChatHistoryResponse)
+@router.get("/chat/history/{session_id}", response_model=None, response_class=ORJSONResponse)
 @langsmith_service.trace(
     name="get_chat_history_endpoint",
     run_type="retriever",
     metadata={"endpoint": "/chat/history", "resource": "session_history"}
 )
-async def get_chat_history(
+def get_chat_history(
     session_id: str,
     fastapi_request: Request,
     current_user: str = Depends(get_current_user)
 ):
     """Get chat history for a specific session"""
-    request_id = getattr(fastapi_request.state, 'request_id', str(uuid.uuid4()))
+    log = LoggingConfig.get_request_logger(fastapi_request)
     
     try:
-        logger.bind(request_id=request_id, user_id=current_user, session_id=session_id).info(
+        log.bind(session_id=session_id).info(
             "Chat history requested"
         )
         
-        # Get chat session to verify user ownership
-        if session_id not in memory_service.sessions:
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        session = memory_service.sessions[session_id]
-        
-        # Verify user owns this session
-        if session.user_id != current_user:
-            raise HTTPException(status_code=403, detail="Access denied to this session")
+        _get_owned_session(session_id, current_user)
         
         chat_history = memory_service.get_chat_history(session_id)
         
         # Convert messages to serializable format
-        messages = []
-        for msg in chat_history:
-            messages.append({
+        messages = [
+            {
                 "type": msg.type,
                 "content": msg.content,
                 "timestamp": getattr(msg, 'timestamp', None)
-            })
+            }
+            for msg in chat_history
+        ]
         
-        return ChatHistoryResponse(
-            session_id=session_id,
-            messages=messages,
-            total_messages=len(messages)
-        )
+        return ORJSONResponse({
+            "session_id": session_id,
+            "messages": messages,
+            "total_messages": len(messages)
+        })
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.bind(request_id=request_id, user_id=current_user).error(f"Error getting chat history: {str(e)}")
+        log.error(f"Error getting chat history: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@router.delete("/chat/session/{session_id}")
+@router.delete("/chat/session/{session_id}", status_code=204, response_class=Response)
 @langsmith_service.trace(
     name="clear_chat_session_endpoint",
     run_type="tool",
@@ -438,33 +544,28 @@ async def clear_chat_session(
     current_user: str = Depends(get_current_user)
 ):
     """Clear a specific chat session"""
-    request_id = getattr(fastapi_request.state, 'request_id', str(uuid.uuid4()))
+    log = LoggingConfig.get_request_logger(fastapi_request)
     
     try:
-        logger.bind(request_id=request_id, user_id=current_user, session_id=session_id).info(
+        log.bind(session_id=session_id).info(
             "Chat session clear requested"
         )
         
         # Verify session exists and user owns it
-        if session_id not in memory_service.sessions:
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        session = memory_service.sessions[session_id]
-        if session.user_id != current_user:
-            raise HTTPException(status_code=403, detail="Access denied to this session")
+        _get_owned_session(session_id, current_user)
         
         memory_service.clear_session(session_id)
         
-        return {"message": f"Session {session_id} cleared successfully"}
+        return Response(status_code=204)
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.bind(request_id=request_id, user_id=current_user).error(f"Error clearing session: {str(e)}")
+        log.error(f"Error clearing session: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@router.get("/chat/sessions", response_model=List[SessionInfo])
+@router.get("/chat/sessions", response_model=None, response_class=ORJSONResponse)
 @langsmith_service.trace(
     name="get_user_sessions_endpoint",
     run_type="retriever",
@@ -475,31 +576,29 @@ async def get_user_sessions(
     current_user: str = Depends(get_current_user)
 ):
     """Get all active sessions for the current user"""
-    request_id = getattr(fastapi_request.state, 'request_id', str(uuid.uuid4()))
+    log = LoggingConfig.get_request_logger(fastapi_request)
     
     try:
-        logger.bind(request_id=request_id, user_id=current_user).info(
+        log.info(
             "User sessions requested"
         )
         
-        user_sessions = []
-        for session_id, session in memory_service.sessions.items():
-            if session.user_id == current_user:
-                message_count = len(session.memory.chat_memory.messages) if hasattr(session.memory, 'chat_memory') else 0
-                
-                user_sessions.append(SessionInfo(
-                    session_id=session_id,
-                    user_id=session.user_id,
-                    created_at=session.created_at,
-                    last_activity=session.last_activity,
-                    message_count=message_count,
-                    metadata=session.metadata
-                ))
+        user_sessions = [
+            {
+                "session_id": session.session_id,
+                "user_id": session.user_id,
+                "created_at": session.created_at,
+                "last_activity": session.last_activity,
+                "message_count": session.message_count,
+                "metadata": session.metadata
+            }
+            for session in memory_service.get_user_sessions(current_user)
+        ]
         
-        return user_sessions
+        return ORJSONResponse(user_sessions)
         
     except Exception as e:
-        logger.bind(request_id=request_id, user_id=current_user).error(f"Error getting user sessions: {str(e)}")
+        log.error(f"Error getting user sessions: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
@@ -517,16 +616,17 @@ async def search_legal_documents(
     current_user: str = Depends(get_current_user)
 ):
     """Enhanced search endpoint with session support"""
-    request_id = getattr(fastapi_request.state, 'request_id', str(uuid.uuid4())) if fastapi_request else str(uuid.uuid4())
+    request_id = (getattr(fastapi_request.state, 'request_id', None) if fastapi_request else None) or secrets.token_hex(16)
+    log = LoggingConfig.get_request_logger(fastapi_request)
     
     try:
-        if not query or len(query.strip()) == 0:
+        if not query or query.isspace():
             raise ValidationError("Search query cannot be empty")
         
         if max_results < 1 or max_results > 50:
             raise ValidationError("max_results must be between 1 and 50")
         
-        logger.bind(request_id=request_id, user_id=current_user, session_id=session_id).info(
+        log.bind(session_id=session_id).info(
             f"Document search request | Query: {query[:50]}... | Max results: {max_results}"
         )
         
@@ -546,15 +646,15 @@ async def search_legal_documents(
         )
         
     except ValidationError as e:
-        logger.bind(request_id=request_id, user_id=current_user).warning(f"Search validation error: {str(e)}")
+        log.warning(f"Search validation error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
     
     except KnowledgeBaseError as e:
-        logger.bind(request_id=request_id, user_id=current_user).error(f"Search knowledge base error: {str(e)}")
+        log.error(f"Search knowledge base error: {str(e)}")
         raise HTTPException(status_code=503, detail="Knowledge base temporarily unavailable")
     
     except Exception as e:
-        logger.bind(request_id=request_id, user_id=current_user).error(f"Unexpected error in search endpoint: {str(e)}")
+        log.error(f"Unexpected error in search endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
@@ -562,29 +662,30 @@ async def search_legal_documents(
 @langsmith_service.trace(
     name="kb_health_check_endpoint",
     run_type="tool",
-    metadata={"endpoint": "/kb/health", "check_type": "health"}
+    metadata={"endpoint": "/kb/health", "check_type": "health"},
+    sample_rate=0.0
 )
-async def knowledge_base_health(
+def knowledge_base_health(
     fastapi_request: Request,
     current_user: str = Depends(get_current_user)
 ):
     """Knowledge base health check endpoint"""
-    request_id = getattr(fastapi_request.state, 'request_id', str(uuid.uuid4()))
+    log = LoggingConfig.get_request_logger(fastapi_request)
     
     try:
-        from app.services.bedrock_kb import BedrockKB
+        from app.services.bedrock_kb import get_kb
 
-        kb = BedrockKB()
+        kb = get_kb()
         health_status = kb.health_check()
         
-        logger.bind(request_id=request_id, user_id=current_user).info(
+        log.info(
             f"KB health check requested | Status: {health_status['status']}"
         )
         
         return health_status
         
     except Exception as e:
-        logger.bind(request_id=request_id, user_id=current_user).error(f"KB health check failed: {str(e)}")
+        log.error(f"KB health check failed: {str(e)}")
         return {
             "status": "unhealthy",
             "error": str(e),
@@ -593,39 +694,41 @@ async def knowledge_base_health(
         }
 
 
+@router.delete("/kb/cache", status_code=204, response_class=Response)
+async def clear_kb_cache(
+    fastapi_request: Request,
+    current_user: str = Depends(get_current_user)
+):
+    """Drop cached KB results, e.g. after the knowledge base has been re-synced"""
+    invalidate_kb_cache()
+    LoggingConfig.get_request_logger(fastapi_request).info("KB result cache cleared")
+    return Response(status_code=204)
+
+
 @router.get("/stats")
 @langsmith_service.trace(
     name="get_stats_endpoint",
     run_type="tool",
-    metadata={"endpoint": "/stats", "resource": "system_stats"}
+    metadata={"endpoint": "/stats", "resource": "system_stats"},
+    sample_rate=0.0
 )
 async def get_chat_stats(
     fastapi_request: Request,
     current_user: str = Depends(get_current_user)
 ):
     """Chat statistics endpoint"""
-    request_id = getattr(fastapi_request.state, 'request_id', str(uuid.uuid4()))
+    log = LoggingConfig.get_request_logger(fastapi_request)
     
-    logger.bind(request_id=request_id, user_id=current_user).info("Chat stats requested")
+    log.info("Chat stats requested")
     
     # Get user's session count and total messages
-    user_sessions = [s for s in memory_service.sessions.values() if s.user_id == current_user]
-    total_messages = sum(len(s.memory.chat_memory.messages) for s in user_sessions if hasattr(s.memory, 'chat_memory'))
+    user_sessions = memory_service.get_user_sessions(current_user)
+    total_messages = sum(s.message_count for s in user_sessions)
     
     return {
         "user": current_user,
         "active_sessions": len(user_sessions),
         "total_messages": total_messages,
         "global_sessions": len(memory_service.sessions),
-        "available_endpoints": [
-            "/v1/chat",
-            "/v1/search", 
-            "/v1/kb/health",
-            "/v1/stats",
-            "/v1/chat/history/{session_id}",
-            "/v1/chat/session/{session_id}",
-            "/v1/chat/sessions",
-            "/v1/test-sessions",
-            "/v1/test-streaming"
-        ]
+        "available_endpoints": _AVAILABLE_ENDPOINTS
     }
\ No newline at end of file
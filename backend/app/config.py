@@ -1,63 +1,69 @@
 # app/config.py
-import os
 from typing import Optional
-from click import prompt
 from pydantic import Field
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from dotenv import load_dotenv
-load_dotenv()  # This explicitly loads .env file
+load_dotenv()  # Populates os.environ for libraries (LangSmith, boto3) that read it directly
 
 class Settings(BaseSettings):
+    # Every field is read from the environment variable of the same name once,
+    # when the module is imported; the instance is frozen afterwards.
+    model_config = SettingsConfigDict(
+        case_sensitive=True,
+        extra="ignore",
+        frozen=True,
+        env_ignore_empty=True,
+    )
+
     # Security settings
-    SECRET_KEY: str = os.getenv("SECRET_KEY", "supersecret")
+    SECRET_KEY: str = "supersecret"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
-    PASSWORD_SALT: str = os.getenv("PASSWORD_SALT", "salt123")
+    PASSWORD_SALT: str = "salt123"
 
     # Demo admin credentials
-    ADMIN_USERNAME: str = os.getenv("ADMIN_USERNAME", "admin")
-    ADMIN_PASSWORD: str = os.getenv("ADMIN_PASSWORD", "admin123")
+    ADMIN_USERNAME: str = "admin"
+    ADMIN_PASSWORD: str = "admin123"
 
     # AWS Configuration
-    AWS_REGION: str = os.getenv("AWS_REGION", "eu-central-1")
-    AWS_ACCESS_KEY_ID: str = os.getenv("AWS_ACCESS_KEY_ID", "")
-    AWS_SECRET_ACCESS_KEY: str = os.getenv("AWS_SECRET_ACCESS_KEY", "")
-    
+    AWS_REGION: str = "eu-central-1"
+    AWS_ACCESS_KEY_ID: str = ""
+    AWS_SECRET_ACCESS_KEY: str = ""
+
     # Bedrock Knowledge Base Configuration
-    BEDROCK_KNOWLEDGE_BASE_ID: str = os.getenv("BEDROCK_KNOWLEDGE_BASE_ID", "")
-    BEDROCK_GENERATION_MODEL: str = os.getenv("BEDROCK_GENERATION_MODEL", "anthropic.claude-3-sonnet-20240229-v1:0")
-    BEDROCK_EMBEDDING_MODEL: str = os.getenv("BEDROCK_EMBEDDING_MODEL", "amazon.titan-embed-text-v1")
-    BEDROCK_GUARDRAIL_ID: str = os.getenv("BEDROCK_GUARDRAIL_ID", "")
-    BEDROCK_GUARDRAIL_VERSION: str = os.getenv("BEDROCK_GUARDRAIL_VERSION", "DRAFT")
-    
+    BEDROCK_KNOWLEDGE_BASE_ID: str = ""
+    BEDROCK_GENERATION_MODEL: str = "anthropic.claude-3-sonnet-20240229-v1:0"
+    BEDROCK_EMBEDDING_MODEL: str = "amazon.titan-embed-text-v1"
+    BEDROCK_GUARDRAIL_ID: str = ""
+    BEDROCK_GUARDRAIL_VERSION: str = "DRAFT"
+
     # Document Processing Configuration
-    PDF_FOLDER_PATH: str = os.getenv("PDF_FOLDER_PATH", "./pdfs")
-    S3_PREFIX: str = os.getenv("S3_PREFIX", "documents/")
-    
+    PDF_FOLDER_PATH: str = "./pdfs"
+    S3_PREFIX: str = "documents/"
+
     # Application Configuration
-    APP_ENV: str = os.getenv("APP_ENV", "development")
-    DEBUG: bool = os.getenv("DEBUG", "false").lower() in ("true", "1", "yes", "on")
-    
+    APP_ENV: str = "development"
+    DEBUG: bool = False
+
     # Logging Configuration
-    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
-    LOG_RETENTION_DAYS: int = int(os.getenv("LOG_RETENTION_DAYS", "30"))
-    
-    # Legacy Bedrock config (keeping for backward compatibility)
-    bedrock_region: str = os.getenv("AWS_REGION", "eu-central-1")
-    bedrock_model_id: str = os.getenv("BEDROCK_GENERATION_MODEL", "anthropic.claude-v2")
-    
-    # LangSmith Configuration
-    LANGCHAIN_TRACING_V2: bool = Field(default=True, env='LANGCHAIN_TRACING_V2')
-    LANGCHAIN_ENDPOINT: str = Field(default="https://api.smith.langchain.com", env='LANGCHAIN_ENDPOINT')
-    LANGCHAIN_API_KEY: Optional[str] = Field(default=None, env='LANGCHAIN_API_KEY')
-    LANGCHAIN_PROJECT: str = Field(default="llm-app-1", env='LANGCHAIN_PROJECT')
+    LOG_LEVEL: str = "INFO"
+    LOG_RETENTION_DAYS: int = 30
 
-    USE_LANGSMITH_PROMPTS: bool = Field(default=True, env='USE_LANGSMITH_PROMPTS')
-    LANGSMITH_PROMPT_NAME: str = Field(default="compliance-prompt", env='LANGSMITH_PROMPT_NAME')
+    # Shared state (optional); rate limits are per process without it
+    REDIS_URL: Optional[str] = None
 
+    # Legacy Bedrock config (keeping for backward compatibility)
+    bedrock_region: str = Field(default="eu-central-1", validation_alias="AWS_REGION")
+    bedrock_model_id: str = Field(default="anthropic.claude-v2", validation_alias="BEDROCK_GENERATION_MODEL")
+
+    # LangSmith Configuration
+    LANGCHAIN_TRACING_V2: bool = True
+    LANGCHAIN_ENDPOINT: str = "https://api.smith.langchain.com"
+    LANGCHAIN_API_KEY: Optional[str] = None
+    LANGCHAIN_PROJECT: str = "llm-app-1"
+    LANGSMITH_SAMPLE_RATE: float = 0.1
 
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
-        extra = "ignore"
+    USE_LANGSMITH_PROMPTS: bool = True
+    LANGSMITH_PROMPT_NAME: str = "compliance-prompt"
+    LANGSMITH_PROMPT_CACHE_TTL: float = 3600.0  # Seconds before a pulled prompt is refreshed
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
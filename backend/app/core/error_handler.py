@@ -1,19 +1,19 @@
 # app/core/error_handler.py
-import uuid
+import secrets
 import time
-import traceback
 from typing import Union
 from fastapi import Request, Response, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from loguru import logger
+from app.config import settings
 from app.core.logging_config import LoggingConfig
 
 class ErrorHandler:
     @staticmethod
     async def http_exception_handler(request: Request, exc: Union[HTTPException, StarletteHTTPException]):
-        request_id = getattr(request.state, 'request_id', str(uuid.uuid4()))
+        request_id = getattr(request.state, 'request_id', None) or secrets.token_hex(16)
         user_id = getattr(request.state, 'user_id', 'anonymous')
         
         LoggingConfig.log_error(
@@ -41,7 +41,7 @@ class ErrorHandler:
 
     @staticmethod
     async def validation_exception_handler(request: Request, exc: RequestValidationError):
-        request_id = getattr(request.state, 'request_id', str(uuid.uuid4()))
+        request_id = getattr(request.state, 'request_id', None) or secrets.token_hex(16)
         user_id = getattr(request.state, 'user_id', 'anonymous')
         
         LoggingConfig.log_error(
@@ -69,11 +69,11 @@ class ErrorHandler:
 
     @staticmethod
     async def general_exception_handler(request: Request, exc: Exception):
-        request_id = getattr(request.state, 'request_id', str(uuid.uuid4()))
+        request_id = getattr(request.state, 'request_id', None) or secrets.token_hex(16)
         user_id = getattr(request.state, 'user_id', 'anonymous')
         
-        logger.bind(request_id=request_id, user_id=user_id).error(
-            f"Unhandled exception: {type(exc).__name__}: {str(exc)}\n{traceback.format_exc()}"
+        logger.bind(request_id=request_id, user_id=user_id).opt(exception=exc).error(
+            "Unhandled exception: {}: {}", type(exc).__name__, exc
         )
         
         return JSONResponse(
@@ -97,7 +97,7 @@ class RequestLoggingMiddleware:
             return
 
         request = Request(scope, receive)
-        request_id = str(uuid.uuid4())
+        request_id = secrets.token_hex(16)
         start_time = time.time()
         
         request.state.request_id = request_id
@@ -110,17 +110,25 @@ class RequestLoggingMiddleware:
                 token = auth_header.split(" ")[1]
                 user_id = verify_jwt_token(token)
                 request.state.user_id = user_id
+                # get_current_user reuses this instead of verifying the token again
+                request.state.current_user = user_id
+                request.state.log = logger.bind(request_id=request_id, user_id=user_id)
         except Exception:
             pass  
         
-        query_params = dict(request.query_params) if request.query_params else None
-        LoggingConfig.log_request_start(
-            request_id=request_id,
-            user_id=user_id,
-            endpoint=request.url.path,
-            method=request.method,
-            query=str(query_params) if query_params else None
-        )
+        endpoint = scope["path"]
+        method = scope["method"]
+        query = scope.get("query_string", b"").decode("latin-1") or None
+        
+        # One record per request; the separate start event is only useful while debugging
+        if settings.DEBUG:
+            LoggingConfig.log_request_start(
+                request_id=request_id,
+                user_id=user_id,
+                endpoint=endpoint,
+                method=method,
+                query=query
+            )
 
         async def send_wrapper(message):
             if message["type"] == "http.response.start":
@@ -131,10 +139,11 @@ class RequestLoggingMiddleware:
                 LoggingConfig.log_request_end(
                     request_id=request_id,
                     user_id=user_id,
-                    endpoint=request.url.path,
-                    method=request.method,
+                    endpoint=endpoint,
+                    method=method,
                     duration=duration,
-                    status_code=status_code
+                    status_code=status_code,
+                    query=query
                 )
             
             await send(message)
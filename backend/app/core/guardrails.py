@@ -1,12 +1,34 @@
 # app/core/guardrails.py - No disclaimers version
+import hashlib
+import threading
 import time
+from functools import lru_cache
 from typing import Dict, Optional
 from loguru import logger
 from botocore.exceptions import ClientError
+from fastapi.concurrency import run_in_threadpool
 
 from app.config import settings
+from app.core.cache import TTLCache
 from app.services.bedrock_client import get_bedrock_client
 
+# Larger payloads are rarely repeated verbatim, so they are not worth caching
+GUARDRAIL_CACHE_MAX_CONTENT = 16 * 1024
+
+# Health probes reuse a Bedrock check for this long, and fall back to a
+# healthy result up to HEALTH_CACHE_MAX_STALE old if a fresh check fails
+HEALTH_CACHE_TTL = 15
+HEALTH_CACHE_MAX_STALE = 60
+
+BLOCKED_RESPONSE = (
+    "I cannot provide a response to this query due to content policy restrictions. "
+    "Please rephrase your question or consult appropriate resources for guidance."
+)
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
 
 class BedrockGuardrails:
     
@@ -14,10 +36,15 @@ class BedrockGuardrails:
         self.guardrail_id = settings.BEDROCK_GUARDRAIL_ID
         self.guardrail_version = getattr(settings, 'BEDROCK_GUARDRAIL_VERSION', 'DRAFT')
         self.is_enabled = bool(self.guardrail_id and self.guardrail_id.strip())
+        self._result_cache = TTLCache(maxsize=4096, ttl=600)
+        # (checked_at, result, last_healthy_at), all monotonic
+        self._health_cache = (0.0, None, 0.0)
+        self._health_lock = threading.Lock()
         
         if self.is_enabled:
             try:
                 self.bedrock_client = get_bedrock_client()
+                self._apply_guardrail = self.bedrock_client.apply_guardrail
                 logger.info(f"Bedrock Guardrails enabled: {self.guardrail_id}")
             except Exception as e:
                 logger.warning(f"Failed to initialize Bedrock Guardrails: {e}")
@@ -37,7 +64,7 @@ class BedrockGuardrails:
             return answer  # Return content as-is
         
         try:
-            result = self._apply_bedrock_guardrails(answer, user_input, request_id, user_id)
+            result = self._cached_bedrock_guardrails(answer, user_input, request_id, user_id)
             
             if result['blocked']:
                 logger.bind(request_id=request_id, user_id=user_id).warning(
@@ -55,6 +82,26 @@ class BedrockGuardrails:
             # Return original content on error
             return answer
 
+    def _cached_bedrock_guardrails(
+        self, 
+        content: str, 
+        user_input: str = None,
+        request_id: str = None,
+        user_id: str = None
+    ) -> Dict:
+        
+        if len(content) > GUARDRAIL_CACHE_MAX_CONTENT:
+            return self._apply_bedrock_guardrails(content, user_input, request_id, user_id)
+        
+        # user_input gets its own key component so prompt-dependent results never collide
+        cache_key = (_digest(content), None if user_input is None else _digest(user_input))
+        result = self._result_cache.get(cache_key)
+        if result is None:
+            result = self._apply_bedrock_guardrails(content, user_input, request_id, user_id)
+            if not result.get('error'):
+                self._result_cache.set(cache_key, result)
+        return result
+
     def _apply_bedrock_guardrails(
         self, 
         content: str, 
@@ -71,7 +118,7 @@ class BedrockGuardrails:
                 'content': [{'text': {'text': content}}]
             }
             
-            response = self.bedrock_client.apply_guardrail(**request_params)
+            response = self._apply_guardrail(**request_params)
             
             action = response.get('action', 'NONE')
             outputs = response.get('outputs', [])
@@ -96,12 +143,31 @@ class BedrockGuardrails:
             return {'blocked': False, 'error': str(e), 'filtered_content': content}
 
     def _generate_blocked_response(self) -> str:
-        return (
-            "I cannot provide a response to this query due to content policy restrictions. "
-            "Please rephrase your question or consult appropriate resources for guidance."
-        )
+        return BLOCKED_RESPONSE
 
     def health_check(self) -> Dict:
+        """Probe Bedrock at most once per HEALTH_CACHE_TTL seconds"""
+        now = time.monotonic()
+        with self._health_lock:
+            checked_at, cached, healthy_at = self._health_cache
+        if cached is not None and now - checked_at < HEALTH_CACHE_TTL:
+            return cached
+        
+        result = self._do_health_check()
+        
+        # A recent healthy result outlives a transient failure, flagged as stale.
+        # It is cached like any other result, so an outage is still probed only once per TTL
+        if result["status"] == "healthy":
+            healthy_at = now
+        elif (result["status"] == "unhealthy" and cached is not None
+                and cached["status"] == "healthy" and now - healthy_at < HEALTH_CACHE_MAX_STALE):
+            result = {**cached, "stale": True}
+        
+        with self._health_lock:
+            self._health_cache = (now, result, healthy_at)
+        return result
+
+    def _do_health_check(self) -> Dict:
         if not self.is_enabled:
             return {
                 "status": "disabled",
@@ -127,13 +193,9 @@ class BedrockGuardrails:
             }
 
 
-_guardrails_instance = None
-
+@lru_cache(maxsize=1)
 def get_guardrails():
-    global _guardrails_instance
-    if _guardrails_instance is None:
-        _guardrails_instance = BedrockGuardrails()
-    return _guardrails_instance
+    return BedrockGuardrails()
 
 def apply_guardrails(
     answer: str, 
@@ -142,4 +204,17 @@ def apply_guardrails(
     user_id: str = None
 ) -> str:
     guardrails = get_guardrails()
-    return guardrails.apply_guardrails(answer, user_input, request_id, user_id)
\ No newline at end of file
+    return guardrails.apply_guardrails(answer, user_input, request_id, user_id)
+
+
+async def apply_guardrails_async(
+    answer: str, 
+    user_input: str = None, 
+    request_id: str = None, 
+    user_id: str = None
+) -> str:
+    """apply_guardrails for async callers; only a configured guardrail (a Bedrock call) goes to the threadpool"""
+    guardrails = get_guardrails()
+    if not guardrails.is_enabled:
+        return answer
+    return await run_in_threadpool(guardrails.apply_guardrails, answer, user_input, request_id, user_id)
@@ -1,6 +1,10 @@
 # app/core/logging_config.py
 import os
 import sys
+import gzip
+import shutil
+import secrets
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from loguru import logger
 from typing import Dict, Any, List
@@ -8,27 +12,43 @@ from typing import Dict, Any, List
 # Import settings to use configuration
 from app.config import settings
 
-def format_record(record):
-    extra = record["extra"]
-    
-    if "request_id" not in extra:
-        extra["request_id"] = "N/A"
-    if "user_id" not in extra:
-        extra["user_id"] = "system"
-    
-    return True  
+def _is_performance_record(record):
+    return "performance" in record["extra"]
+
+# Rotated segments are gzipped here so the sink's writer thread is not held up
+_compression_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-compress")
+
+def _gzip_file(path: str):
+    with open(path, "rb") as src, gzip.open(f"{path}.gz", "wb", compresslevel=1) as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(path)
+
+def _compress_in_background(path: str):
+    _compression_pool.submit(_gzip_file, path)
+
+def _query_preview(query: str = None) -> str:
+    if not query:
+        return ""
+    if len(query) > 100:
+        return f" | Query: {query[:100]}..."
+    return f" | Query: {query}"
+
 class LoggingConfig:
     def __init__(self):
         self.setup_logging()
     
     def setup_logging(self):
         logger.remove()
+        # Defaults for {extra[...]} in the sink formats; bound values take precedence
+        logger.configure(extra={"request_id": "N/A", "user_id": "system"})
         
         logs_dir = Path("logs")
         logs_dir.mkdir(exist_ok=True)
         
         log_level = getattr(settings, 'LOG_LEVEL', 'INFO').upper()
         retention_days = getattr(settings, 'LOG_RETENTION_DAYS', 30)
+        # Variable dumps in tracebacks are slow to render and leak values; keep them out of prod files
+        verbose_tracebacks = settings.APP_ENV != "production"
         
         if settings.APP_ENV != "production":
             logger.add(
@@ -37,8 +57,7 @@ class LoggingConfig:
                 format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
                 colorize=True,
                 backtrace=True,
-                diagnose=True,
-                filter=format_record
+                diagnose=True
             )
         else:
             logger.add(
@@ -46,8 +65,7 @@ class LoggingConfig:
                 level="WARNING",  # Only warnings and errors in prod console
                 format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} | {extra[request_id]} | {extra[user_id]} | {message}",
                 backtrace=False,
-                diagnose=False,
-                filter=format_record
+                diagnose=False
             )
         
         logger.add(
@@ -56,12 +74,11 @@ class LoggingConfig:
             format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} | {extra[request_id]} | {extra[user_id]} | {message}",
             rotation="100 MB",
             retention=f"{retention_days} days",
-            compression="zip",
-            backtrace=True,
-            diagnose=True,
-            enqueue=True,  # Thread-safe logging
-            serialize=False,
-            filter=format_record
+            compression=_compress_in_background,
+            backtrace=verbose_tracebacks,
+            diagnose=verbose_tracebacks,
+            enqueue=True,  # Written from a background thread, off the event loop
+            serialize=False
         )
         
         logger.add(
@@ -70,20 +87,20 @@ class LoggingConfig:
             format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} | {extra[request_id]} | {extra[user_id]} | {message}",
             rotation="50 MB",
             retention=f"{retention_days * 2} days",  # Keep errors longer
-            compression="zip",
-            backtrace=True,
-            diagnose=True,
-            enqueue=True,
-            filter=format_record
+            compression=_compress_in_background,
+            backtrace=verbose_tracebacks,
+            diagnose=verbose_tracebacks,
+            enqueue=True
         )
         
         logger.add(
             "logs/performance.log",
             level="INFO",
             format="{time:YYYY-MM-DD HH:mm:ss} | {extra[endpoint]} | {extra[method]} | {extra[duration]} | {extra[status_code]} | {extra[user_id]} | {message}",
-            filter=lambda record: format_record(record) and "performance" in record["extra"],
+            filter=_is_performance_record,
             rotation="50 MB",
-            retention="7 days"
+            retention="7 days",
+            enqueue=True
         )
         
         if settings.DEBUG:
@@ -93,7 +110,7 @@ class LoggingConfig:
                 format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {level} | {name}:{function}:{line} | {extra[request_id]} | {message}",
                 rotation="25 MB",
                 retention="3 days",
-                filter=format_record
+                enqueue=True
             )
 
     @staticmethod
@@ -102,35 +119,56 @@ class LoggingConfig:
             return logger.bind(name=name, request_id="system", user_id="system")
         return logger.bind(request_id="system", user_id="system")
 
+    @staticmethod
+    def get_request_logger(request=None):
+        """Logger bound once per request and cached on request.state"""
+        state = getattr(request, "state", None)
+        log = getattr(state, "log", None)
+        if log is None:
+            request_id = getattr(state, "request_id", None) or secrets.token_hex(16)
+            log = logger.bind(request_id=request_id)
+            if state is not None:
+                state.log = log
+        return log
+
     @staticmethod
     def log_request_start(request_id: str, user_id: str, endpoint: str, method: str, query: str = None):
-        logger.bind(request_id=request_id, user_id=user_id).info(
-            f"Request started - {method} {endpoint}" + (f" | Query: {query[:100]}..." if query and len(query) > 100 else f" | Query: {query}" if query else "")
+        # Lazy so the query preview is only built when a sink takes INFO
+        logger.bind(request_id=request_id, user_id=user_id).opt(lazy=True).info(
+            "Request started - {}{}",
+            lambda: f"{method} {endpoint}",
+            lambda: _query_preview(query)
         )
 
     @staticmethod
-    def log_request_end(request_id: str, user_id: str, endpoint: str, method: str, duration: float, status_code: int):
+    def log_request_end(request_id: str, user_id: str, endpoint: str, method: str, duration: float, status_code: int, query: str = None):
         logger.bind(
             request_id=request_id, 
             user_id=user_id,
             endpoint=endpoint,
             method=method,
+            query=query,
             duration=f"{duration:.3f}s",
             status_code=status_code,
             performance=True
-        ).info(f"Request completed in {duration:.3f}s")
+        ).info("Request completed - {} {} in {:.3f}s", method, endpoint, duration)
 
     @staticmethod
     def log_error(request_id: str, user_id: str, error: Exception, context: Dict[str, Any] = None):
-        context_str = f" | Context: {context}" if context else ""
-        logger.bind(request_id=request_id, user_id=user_id).error(
-            f"Error occurred: {type(error).__name__}: {str(error)}{context_str}"
+        logger.bind(request_id=request_id, user_id=user_id).opt(lazy=True).error(
+            "Error occurred: {}: {}{}",
+            lambda: type(error).__name__,
+            lambda: str(error),
+            lambda: f" | Context: {context}" if context else ""
         )
 
     @staticmethod
     def log_kb_query(request_id: str, user_id: str, query: str, num_results: int, duration: float):
-        logger.bind(request_id=request_id, user_id=user_id).info(
-            f"KB Query completed | Results: {num_results} | Duration: {duration:.3f}s | Query: {query[:100]}..."
+        logger.bind(request_id=request_id, user_id=user_id).opt(lazy=True).info(
+            "KB Query completed | Results: {} | Duration: {:.3f}s | Query: {}...",
+            lambda: num_results,
+            lambda: duration,
+            lambda: query[:100]
         )
 
     @staticmethod
@@ -174,16 +212,18 @@ class LoggingConfig:
     ):
         if error:
             logger.bind(request_id=request_id, user_id=user_id).error(
-                f"Guardrails processing failed: {error}"
+                "Guardrails processing failed: {}", error
             )
         elif blocked:
-            blocked_cats = f" | Categories: {', '.join(categories_blocked)}" if categories_blocked else ""
-            logger.bind(request_id=request_id, user_id=user_id).warning(
-                f"Content BLOCKED by guardrails | Bedrock: {bedrock_enabled} | Duration: {duration:.3f}s{blocked_cats}"
+            logger.bind(request_id=request_id, user_id=user_id).opt(lazy=True).warning(
+                "Content BLOCKED by guardrails | Bedrock: {} | Duration: {:.3f}s{}",
+                lambda: bedrock_enabled,
+                lambda: duration,
+                lambda: f" | Categories: {', '.join(categories_blocked)}" if categories_blocked else ""
             )
         else:
             logger.bind(request_id=request_id, user_id=user_id).info(
-                f"Guardrails passed | Bedrock: {bedrock_enabled} | Duration: {duration:.3f}s"
+                "Guardrails passed | Bedrock: {} | Duration: {:.3f}s", bedrock_enabled, duration
             )
 
 logging_config = LoggingConfig()
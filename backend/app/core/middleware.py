@@ -1,122 +1,254 @@
 # app/core/middleware.py
 import time
-import uuid
-from typing import Callable, Optional, List
-from fastapi import Request, Response
-from fastapi.responses import JSONResponse
+import secrets
+from typing import ClassVar, Dict, FrozenSet, Optional, List
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.datastructures import URL, Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from loguru import logger
-import json
-from collections import defaultdict
-from datetime import datetime, timedelta
 
+from app.config import settings
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    aioredis = None
+    REDIS_AVAILABLE = False
+
+# Atomic token bucket shared by every worker: KEYS[1] is the bucket hash,
+# ARGV is capacity, refill per second and the caller's wall-clock time
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate))
+return allowed
+"""
+
+# After a failed Redis call the shared limit is skipped for this long, so an
+# outage costs one socket timeout and one warning per window, not per request
+_REDIS_RETRY_AFTER = 30.0
+
+# Every middleware below is a plain ASGI callable: BaseHTTPMiddleware spawns a
+# task group and a memory stream per request, which all of these would pay for
+
+
+def _client_ip(scope: Scope) -> str:
+    """Resolve the caller's IP once per request and keep it in scope["state"] (request.state.real_ip)"""
+    state = scope.setdefault("state", {})
+    real_ip = state.get("real_ip")
+    if real_ip is None:
+        forwarded_for = Headers(scope=scope).get("x-forwarded-for")
+        real_ip = forwarded_for.partition(",")[0].strip() if forwarded_for else ""
+        if not real_ip:
+            client = scope.get("client")
+            real_ip = client[0] if client else "unknown"
+        state["real_ip"] = real_ip
+    return real_ip
+
+
+def _encode_headers(headers: Dict[str, str]) -> List[tuple]:
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+
+
+class _AppendHeadersMiddleware:
+    """Appends a fixed set of headers to every HTTP response."""
+
+    def __init__(self, app: ASGIApp, headers: Dict[str, str]):
+        self.app = app
+        self.raw_headers = tuple(_encode_headers(headers))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                # A new list rather than extend(): the original may be shared by
+                # a Response object or a replayed cached message
+                message["headers"] = [*message.get("headers", ()), *self.raw_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class RequestLoggingMiddleware:
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    
     def __init__(self, app: ASGIApp):
-        super().__init__(app)
-        self.request_count = defaultdict(int)
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
-        
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = secrets.token_hex(16)
+        # request.state reads from scope["state"]
+        state = scope.setdefault("state", {})
+        state["request_id"] = request_id
+        state["log"] = logger.bind(request_id=request_id)
+
         start_time = time.time()
-        
-        client_ip = request.client.host if request.client else "unknown"
-        forwarded_for = request.headers.get("X-Forwarded-For", "").split(",")[0].strip()
-        real_ip = forwarded_for if forwarded_for else client_ip
-        
-        logger.bind(
-            request_id=request_id,
-            method=request.method,
-            url=str(request.url),
-            client_ip=real_ip,
-            user_agent=request.headers.get("User-Agent", "unknown")
-        ).info("Request started")
-        
-        try:
-            response = await call_next(request)
-            
-            process_time = time.time() - start_time
-            
+
+        headers = Headers(scope=scope)
+        method = scope["method"]
+        real_ip = _client_ip(scope)
+        url = str(URL(scope=scope))
+        user_agent = headers.get("user-agent", "unknown")
+
+        # One record per request; the separate start event is only useful while debugging
+        if settings.DEBUG:
             logger.bind(
                 request_id=request_id,
-                method=request.method,
-                url=str(request.url),
-                status_code=response.status_code,
-                process_time=f"{process_time:.3f}s",
-                client_ip=real_ip
-            ).info("Request completed")
-            
-            response.headers["X-Request-ID"] = request_id
-            response.headers["X-Process-Time"] = f"{process_time:.3f}s"
-            
-            return response
-            
+                method=method,
+                url=url,
+                client_ip=real_ip,
+                user_agent=user_agent
+            ).info("Request started")
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                process_time = time.time() - start_time
+
+                logger.bind(
+                    request_id=request_id,
+                    method=method,
+                    url=url,
+                    status_code=message["status"],
+                    process_time=f"{process_time:.3f}s",
+                    client_ip=real_ip,
+                    user_agent=user_agent
+                ).info("Request completed")
+
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"x-request-id", request_id.encode("latin-1")),
+                    (b"x-process-time", f"{process_time:.3f}s".encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
             process_time = time.time() - start_time
-            
+
             logger.bind(
                 request_id=request_id,
-                method=request.method,
-                url=str(request.url),
+                method=method,
+                url=url,
                 process_time=f"{process_time:.3f}s",
                 client_ip=real_ip,
+                user_agent=user_agent,
                 error=str(e)
             ).error("Request failed with exception")
-            
+
             raise
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    
+class SecurityHeadersMiddleware(_AppendHeadersMiddleware):
+
     def __init__(self, app: ASGIApp):
-        super().__init__(app)
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
-        
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        
-        return response
+        super().__init__(app, {
+            "X-Content-Type-Options": "nosniff",
+            "X-Frame-Options": "DENY",
+            "X-XSS-Protection": "1; mode=block",
+            "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+            "Referrer-Policy": "strict-origin-when-cross-origin",
+        })
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    
-    def __init__(self, app: ASGIApp, requests_per_minute: int = 100):
-        super().__init__(app)
+class RateLimitMiddleware:
+
+    _SKIP_PATHS: ClassVar[FrozenSet[str]] = frozenset({"/health", "/", "/docs", "/openapi.json"})
+
+    def __init__(self, app: ASGIApp, requests_per_minute: int = 100, redis_url: Optional[str] = None):
+        self.app = app
         self.requests_per_minute = requests_per_minute
-        self.request_counts = defaultdict(list)
-    
-    def _clean_old_requests(self, ip: str, now: datetime):
-        cutoff = now - timedelta(minutes=1)
-        self.request_counts[ip] = [
-            req_time for req_time in self.request_counts[ip] 
-            if req_time > cutoff
-        ]
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        if request.url.path in ["/health", "/", "/docs", "/openapi.json"]:
-            return await call_next(request)
-        
-        client_ip = request.client.host if request.client else "unknown"
-        forwarded_for = request.headers.get("X-Forwarded-For", "").split(",")[0].strip()
-        real_ip = forwarded_for if forwarded_for else client_ip
-        
-        now = datetime.now()
-        
-        self._clean_old_requests(real_ip, now)
-        
-        if len(self.request_counts[real_ip]) >= self.requests_per_minute:
+        self.refill_per_second = requests_per_minute / 60.0
+        # ip -> [tokens, last_refill]; a full bucket allows a burst of requests_per_minute
+        self.buckets: Dict[str, List[float]] = {}
+        self._next_sweep = 0.0
+
+        # With Redis configured the limit holds across all workers; the local
+        # buckets remain as the fallback whenever Redis is unreachable
+        self._redis_bucket = None
+        self._redis_retry_at = 0.0
+        if redis_url and REDIS_AVAILABLE:
+            client = aioredis.from_url(redis_url, socket_timeout=0.25, socket_connect_timeout=0.25)
+            self._redis_bucket = client.register_script(_TOKEN_BUCKET_LUA)
+            logger.info("Rate limiting shared through Redis")
+        elif redis_url:
+            logger.warning("REDIS_URL is set but redis is not installed; rate limiting per process")
+
+    async def _take_shared_token(self, ip: str) -> Optional[bool]:
+        if time.monotonic() < self._redis_retry_at:
+            return None
+        try:
+            allowed = await self._redis_bucket(
+                keys=[f"rl:{ip}"],
+                args=[self.requests_per_minute, self.refill_per_second, time.time()]
+            )
+            return bool(allowed)
+        except Exception as e:
+            # Concurrent requests may fail together; only the first one to trip the breaker logs
+            if time.monotonic() >= self._redis_retry_at:
+                logger.warning(
+                    f"Redis rate limit check failed, using local buckets for {_REDIS_RETRY_AFTER:.0f}s: {e}"
+                )
+            self._redis_retry_at = time.monotonic() + _REDIS_RETRY_AFTER
+            return None
+
+    def _sweep_idle(self, now: float):
+        # A bucket untouched for a minute has refilled completely, which is
+        # exactly what a missing entry means, so idle IPs can be dropped
+        self.buckets = {ip: bucket for ip, bucket in self.buckets.items() if now - bucket[1] < 60}
+        self._next_sweep = now + 60
+
+    def _take_token(self, ip: str, now: float) -> bool:
+        if now >= self._next_sweep:
+            self._sweep_idle(now)
+
+        bucket = self.buckets.get(ip)
+        if bucket is None:
+            self.buckets[ip] = [self.requests_per_minute - 1, now]
+            return True
+
+        bucket[0] = min(self.requests_per_minute, bucket[0] + (now - bucket[1]) * self.refill_per_second)
+        bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self._SKIP_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        real_ip = _client_ip(scope)
+
+        allowed = None
+        if self._redis_bucket is not None:
+            allowed = await self._take_shared_token(real_ip)
+        if allowed is None:
+            allowed = self._take_token(real_ip, time.monotonic())
+
+        if not allowed:
             logger.warning(f"Rate limit exceeded for IP: {real_ip}")
-            return JSONResponse(
+            response = ORJSONResponse(
                 status_code=429,
                 content={
                     "error": "Rate limit exceeded",
@@ -125,85 +257,135 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                 },
                 headers={"Retry-After": "60"}
             )
-        
-        self.request_counts[real_ip].append(now)
-        
-        return await call_next(request)
+            await response(scope, receive, send)
+            return
 
+        await self.app(scope, receive, send)
+
+
+class HealthCheckMiddleware:
 
-class HealthCheckMiddleware(BaseHTTPMiddleware):
-    
     def __init__(self, app: ASGIApp):
-        super().__init__(app)
-        self.cached_health = None
-        self.cache_time = None
-        self.cache_duration = 30  
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        if request.method == "GET" and request.url.path == "/health":
-            now = datetime.now()
-            
-            if (self.cached_health and self.cache_time and 
-                (now - self.cache_time).seconds < self.cache_duration):
-                
-                logger.debug("Returning cached health check response")
-                return JSONResponse(content=self.cached_health)
-        
-        response = await call_next(request)
-        
-        if (request.method == "GET" and request.url.path == "/health" and 
-            response.status_code == 200 and hasattr(response, 'body')):
-            
-            try:
-                body = getattr(response, 'body', b'')
-                if body:
-                    self.cached_health = json.loads(body.decode())
-                    self.cache_time = datetime.now()
+        self.app = app
+        # Raw headers and body of the last 200 response, replayed without re-encoding.
+        # Per-caller CORS headers are left out; the CORS layer outside adds them on replay
+        self.cached_headers: Optional[List[tuple]] = None
+        self.cached_body: Optional[bytes] = None
+        self.cache_time = 0.0
+        self.cache_duration = 30
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"] != "/health":
+            await self.app(scope, receive, send)
+            return
+
+        if self.cached_body is not None and time.monotonic() - self.cache_time < self.cache_duration:
+            logger.debug("Returning cached health check response")
+            # Outer layers append to the start message's headers, so each replay gets a fresh list
+            await send({"type": "http.response.start", "status": 200, "headers": list(self.cached_headers)})
+            await send({"type": "http.response.body", "body": self.cached_body})
+            return
+
+        headers: Optional[List[tuple]] = None
+        chunks: List[bytes] = []
+
+        async def send_wrapper(message: Message):
+            nonlocal headers
+            if message["type"] == "http.response.start":
+                if message["status"] == 200:
+                    headers = [
+                        (name, value) for name, value in message.get("headers", ())
+                        if not (name.startswith(b"access-control-") or name == b"vary")
+                    ]
+            elif message["type"] == "http.response.body" and headers is not None:
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    self.cached_headers = headers
+                    self.cached_body = b"".join(chunks)
+                    self.cache_time = time.monotonic()
                     logger.debug("Cached health check response")
-            except Exception as e:
-                logger.warning(f"Failed to cache health check response: {e}")
-        
-        return response
+            await send(message)
 
+        await self.app(scope, receive, send_wrapper)
+
+
+class RequestSizeMiddleware:
 
-class RequestSizeMiddleware(BaseHTTPMiddleware):
-    
     def __init__(self, app: ASGIApp, max_size: int = 10 * 1024 * 1024):  # 10MB default
-        super().__init__(app)
+        self.app = app
         self.max_size = max_size
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        content_length = request.headers.get("Content-Length")
-        
-        if content_length:
-            try:
-                content_length = int(content_length)
-                if content_length > self.max_size:
-                    logger.warning(f"Request too large: {content_length} bytes (max: {self.max_size})")
-                    return JSONResponse(
-                        status_code=413,
-                        content={
-                            "error": "Request entity too large",
-                            "detail": f"Maximum request size is {self.max_size} bytes",
-                            "received": content_length
-                        }
-                    )
-            except ValueError:
-                pass  # Invalid Content-Length header, let FastAPI handle it
-        
-        return await call_next(request)
 
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            content_length = Headers(scope=scope).get("content-length")
+
+            if content_length:
+                try:
+                    content_length = int(content_length)
+                    if content_length > self.max_size:
+                        logger.warning(f"Request too large: {content_length} bytes (max: {self.max_size})")
+                        response = ORJSONResponse(
+                            status_code=413,
+                            content={
+                                "error": "Request entity too large",
+                                "detail": f"Maximum request size is {self.max_size} bytes",
+                                "received": content_length
+                            }
+                        )
+                        await response(scope, receive, send)
+                        return
+                except ValueError:
+                    pass  # Invalid Content-Length header, let FastAPI handle it
+
+        await self.app(scope, receive, send)
+
+
+class APIVersionMiddleware(_AppendHeadersMiddleware):
 
-class APIVersionMiddleware(BaseHTTPMiddleware):
-    
     def __init__(self, app: ASGIApp, version: str = "0.4"):
-        super().__init__(app)
+        super().__init__(app, {"X-API-Version": version})
         self.version = version
+
+
+class StaticResponseMiddleware:
+    """Pure ASGI layer that answers fixed GET endpoints with pre-serialized JSON
+    before any other middleware, routing or auth run. Register it last so it is
+    outermost; since CORSMiddleware never sees these requests, it adds the CORS
+    headers itself for origins in allowed_origins."""
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
-        response.headers["X-API-Version"] = self.version
-        return response
+    def __init__(
+        self,
+        app: ASGIApp,
+        responses: Optional[Dict[str, bytes]] = None,
+        allowed_origins: Optional[List[str]] = None,
+        allow_credentials: bool = True
+    ):
+        self.app = app
+        self.responses = {
+            path: (body, [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"vary", b"Origin"),
+            ])
+            for path, body in (responses or {}).items()
+        }
+        self.allowed_origins = frozenset(origin.encode("latin-1") for origin in (allowed_origins or ()))
+        # Same headers CORSMiddleware sends on a simple request from an allowed origin
+        self._cors_headers = [(b"access-control-allow-credentials", b"true")] if allow_credentials else []
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            cached = self.responses.get(scope["path"])
+            if cached is not None:
+                body, headers = cached
+                origin = next((value for name, value in scope["headers"] if name == b"origin"), None)
+                if origin in self.allowed_origins:
+                    headers = [*headers, (b"access-control-allow-origin", origin), *self._cors_headers]
+                await send({"type": "http.response.start", "status": 200, "headers": headers})
+                await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+                return
+        
+        await self.app(scope, receive, send)
 
 
 def setup_middlewares(app, config: Optional[dict] = None):
@@ -242,7 +424,8 @@ def setup_middlewares(app, config: Optional[dict] = None):
     if config.get("enable_rate_limiting", True):
         app.add_middleware(
             RateLimitMiddleware,
-            requests_per_minute=config.get("rate_limit_rpm", 100)
+            requests_per_minute=config.get("rate_limit_rpm", 100),
+            redis_url=config.get("redis_url")
         )
     
     if config.get("enable_security_headers", True):
@@ -280,6 +463,7 @@ __all__ = [
     "HealthCheckMiddleware",
     "RequestSizeMiddleware",
     "APIVersionMiddleware",
+    "StaticResponseMiddleware",
     "setup_middlewares",
     "setup_cors_only"
 ]
\ No newline at end of file
@@ -1,40 +1,107 @@
 # app/core/orchestrator.py
 
+import re
 import time
-import json
-import uuid
-from typing import Optional, List, AsyncGenerator
+import asyncio
+import hashlib
+import orjson
+import secrets
+from typing import Awaitable, Callable, Dict, Hashable, Optional, List, AsyncGenerator
 from loguru import logger
+from fastapi.concurrency import run_in_threadpool
 
 from app.models.request_models import ChatRequest
 from app.models.response_models import ChatResponse, Citation
-from app.services.bedrock_kb import BedrockKB
-from app.services.bedrock_client import get_bedrock_client
+from app.services.bedrock_kb import get_kb
+from app.services.bedrock_client import get_bedrock_client, get_model_id_or_inference_profile, log_token_usage
 from app.services.memory_service import memory_service
 from app.services.streaming import streaming_service
 from app.services.langsmith_service import langsmith_service
 from app.services.prompt_service import prompt_service
-from app.core.guardrails import apply_guardrails
-from backend.app.core.eurlex_tool import lookup_statute
+from app.core.cache import TTLCache
+from app.core.guardrails import apply_guardrails_async
 from app.core.error_handler import ValidationError
-from app.config import settings
 
+# Repeated questions reuse the retrieval for 15 minutes and the completion for 5;
+# completions are keyed on the exact request payload, history included
+_KB_RESULT_CACHE = TTLCache(maxsize=1024, ttl=900)
+_COMPLETION_CACHE = TTLCache(maxsize=512, ttl=300)
+# key -> future of the call currently computing it, so identical concurrent requests share one call
+_inflight: Dict[Hashable, asyncio.Future] = {}
 
-def _get_model_id_or_inference_profile():
-    region = getattr(settings, 'AWS_REGION', 'us-east-1')
-    custom_model = getattr(settings, 'BEDROCK_GENERATION_MODEL', None)
+# KB calls each hold a threadpool worker for a full Bedrock round trip; capping
+# them leaves workers free for generation and guardrails under a burst
+_KB_CONCURRENCY = asyncio.Semaphore(24)
+
+
+async def _cached(cache: TTLCache, key: Hashable, compute: Callable[[], Awaitable]):
+    """Return a cached value, joining an identical in-flight call instead of repeating it.
+    Empty results (no documents, no answer) are not cached."""
+    value = cache.get(key)
+    if value is not None:
+        logger.debug("Cache hit ({})", key[0])
+        return value
     
-    if custom_model and custom_model.startswith(('us.', 'eu.', 'apac.', 'arn:aws:bedrock')):
-        return custom_model
+    pending = _inflight.get(key)
+    while pending is not None:
+        logger.debug("Joined in-flight call ({})", key[0])
+        # wait() leaves the shared future alone if this caller is cancelled, and
+        # returns without raising if the caller that owns it was cancelled
+        await asyncio.wait((pending,))
+        if not pending.cancelled():
+            return pending.result()
+        # Its owner went away mid-call; take over (or join whoever already did)
+        pending = _inflight.get(key)
     
-    if region.startswith('eu-'):
-        return "eu.amazon.nova-pro-v1:0"
-    elif region.startswith('ap-'):
-        return "apac.amazon.nova-pro-v1:0"
-    elif region.startswith('us-'):
-        return "us.amazon.nova-pro-v1:0"
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        value = await compute()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # Marks it retrieved when nobody else was waiting
+        raise
     else:
-        return "eu.amazon.nova-pro-v1:0"
+        if value:
+            cache.set(key, value)
+        future.set_result(value)
+        return value
+    finally:
+        _inflight.pop(key, None)
+
+
+def invalidate_kb_cache():
+    """Drop cached retrievals and the completions built on them, e.g. after a KB re-sync"""
+    _KB_RESULT_CACHE.clear()
+    _COMPLETION_CACHE.clear()
+    streaming_service.clear_cache()
+
+
+# Case, punctuation and spacing don't change what the vector search returns
+_QUERY_NOISE = re.compile(r"\W+")
+
+
+async def _retrieve_documents(query: str, max_results: int, request_id: str, user_id: str) -> list:
+    kb = get_kb()
+    
+    async def retrieve():
+        async with _KB_CONCURRENCY:
+            return await run_in_threadpool(
+                kb.retrieve_documents,
+                query=query,
+                max_results=max_results,
+                request_id=request_id,
+                user_id=user_id
+            )
+    
+    return await _cached(
+        _KB_RESULT_CACHE,
+        ("kb", _QUERY_NOISE.sub(" ", query).strip().lower(), max_results),
+        retrieve
+    )
 
 
 @langsmith_service.trace(
@@ -55,7 +122,7 @@ async def chat_pipeline_streaming(
             return
         
         if not session_id:
-            session_id = str(uuid.uuid4())
+            session_id = secrets.token_hex(16)
         
         chat_session = memory_service.get_or_create_session(
             session_id=session_id,
@@ -64,15 +131,13 @@ async def chat_pipeline_streaming(
             window_size=10
         )
         
-        memory_variables = memory_service.get_memory_variables(session_id)
-        chat_history = memory_variables.get("chat_history", [])
+        # Already in messages-v1 form, so there is no LangChain memory to load or convert
+        chat_history = chat_session.bedrock_messages
         
-        # Check if we need KB context
         kb_context = ""
         if _should_use_kb(request.query):
             kb_context = await _get_kb_context(request.query, request_id, user_id)
         
-        full_response = ""
         async for chunk_data in streaming_service.stream_response(
             query=request.query,
             chat_history=chat_history,
@@ -82,11 +147,10 @@ async def chat_pipeline_streaming(
             user_id=user_id
         ):
             if chunk_data["type"] == "chunk":
-                full_response += chunk_data["content"]
                 yield chunk_data
             elif chunk_data["type"] == "complete":
-                full_response = chunk_data["content"]
-                memory_service.add_message(session_id, request.query, full_response)
+                # The complete event carries the full guarded answer, so deltas need no tally here
+                memory_service.add_message(session_id, request.query, chunk_data["content"])
                 yield chunk_data
                 break
             elif chunk_data["type"] == "error":
@@ -119,7 +183,7 @@ async def chat_pipeline(
             raise ValidationError("Query cannot be empty")
         
         if not session_id:
-            session_id = str(uuid.uuid4())
+            session_id = secrets.token_hex(16)
         
         chat_session = memory_service.get_or_create_session(
             session_id=session_id,
@@ -128,12 +192,10 @@ async def chat_pipeline(
             window_size=10
         )
         
-        memory_variables = memory_service.get_memory_variables(session_id)
-        chat_history = memory_variables.get("chat_history", [])
+        # Already in messages-v1 form, so there is no LangChain memory to load or convert
+        chat_history = chat_session.bedrock_messages
         
-        # Check if we need KB context
-        kb_context = ""
-        kb_citations = []
+        kb_context, kb_citations = "", []
         if _should_use_kb(request.query):
             kb_context, kb_citations = await _get_kb_context_with_citations(
                 request.query, request_id, user_id
@@ -171,34 +233,34 @@ async def chat_pipeline(
         )
 
 
+_KB_KEYWORDS = (
+    "article", "section", "regulation", "requirement",
+    "gdpr", "compliance", "legal", "specific", "exact"
+)
+
+# One short-circuiting pass over the query; substring match, as before, so
+# "articles" or "GDPR's" still trigger a lookup
+_KB_KEYWORD_PATTERN = re.compile("|".join(map(re.escape, _KB_KEYWORDS)), re.IGNORECASE)
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
 def _should_use_kb(query: str) -> bool:
     """Simple check if query needs KB lookup"""
-    kb_keywords = [
-        "article", "section", "regulation", "requirement",
-        "gdpr", "compliance", "legal", "specific", "exact"
-    ]
-    return any(keyword in query.lower() for keyword in kb_keywords)
+    return _KB_KEYWORD_PATTERN.search(query) is not None
 
 
 async def _get_kb_context(query: str, request_id: str, user_id: str) -> str:
     """Get KB documents as context string"""
     try:
-        kb = BedrockKB()
-        results = kb.retrieve_documents(
-            query=query,
-            max_results=3,
-            request_id=request_id,
-            user_id=user_id
-        )
+        results = await _retrieve_documents(query, 3, request_id, user_id)
         
         if not results:
             return ""
         
-        context_parts = []
-        for result in results:
-            context_parts.append(f"Source: {result.source}\n{result.content[:800]}")
-        
-        return "\n\n".join(context_parts)
+        return "\n\n".join(f"Source: {result.source}\n{result.content[:800]}" for result in results)
         
     except Exception as e:
         logger.error(f"KB lookup failed: {str(e)}")
@@ -212,13 +274,7 @@ async def _get_kb_context_with_citations(
 ) -> tuple[str, List[Citation]]:
     """Get KB documents as context string with citations"""
     try:
-        kb = BedrockKB()
-        results = kb.retrieve_documents(
-            query=query,
-            max_results=3,
-            request_id=request_id,
-            user_id=user_id
-        )
+        results = await _retrieve_documents(query, 3, request_id, user_id)
         
         if not results:
             return "", []
@@ -227,13 +283,10 @@ async def _get_kb_context_with_citations(
         citations = []
         
         for result in results:
-            context_parts.append(f"Source: {result.source}\n{result.content[:800]}")
-            citations.append(
-                Citation(
-                    source=result.source,
-                    snippet=result.content[:500] + "..." if len(result.content) > 500 else result.content
-                )
-            )
+            source, content = result.source, result.content
+            context_parts.append(f"Source: {source}\n{content[:800]}")
+            # Both fields are strings straight from the KB parser, so validation is skipped
+            citations.append(Citation.model_construct(source=source, snippet=_truncate(content, 500)))
         
         return "\n\n".join(context_parts), citations
         
@@ -242,6 +295,27 @@ async def _get_kb_context_with_citations(
         return "", []
 
 
+def _invoke_model_json(bedrock_client, **kwargs) -> dict:
+    # The response body is a blocking stream, so it is read in the same worker thread
+    response = bedrock_client.invoke_model(
+        contentType="application/json",
+        accept="application/json",
+        **kwargs
+    )
+    return orjson.loads(response['body'].read())
+
+
+def _complete(bedrock_client, model_id: str, payload: bytes) -> str:
+    """Answer text of a messages-v1 completion, or "" if the model returned none"""
+    response_body = _invoke_model_json(bedrock_client, modelId=model_id, body=payload)
+    log_token_usage(response_body.get("usage"))
+    
+    try:
+        return response_body['output']['message']['content'][0]['text']
+    except (KeyError, IndexError, TypeError):
+        return ""
+
+
 @langsmith_service.trace(
     name="generate_response",
     run_type="llm",
@@ -260,15 +334,13 @@ async def _generate_response(
     try:
         bedrock_client = get_bedrock_client()
         
-        # Build messages with KB context injected into prompt
         messages = prompt_service.build_messages_with_history(
             query=query,
             chat_history=chat_history,
-            kb_context=kb_context,
             max_history=6
         )
         
-        model_id = _get_model_id_or_inference_profile()
+        model_id = get_model_id_or_inference_profile()
         
         body = {
             "schemaVersion": "messages-v1",
@@ -278,29 +350,22 @@ async def _generate_response(
                 "temperature": 0.3
             }
         }
-        
-        response = bedrock_client.invoke_model(
-            modelId=model_id,
-            body=json.dumps(body),
-            contentType="application/json",
-            accept="application/json"
+        # KB context rides after the cache point, so the prompt prefix stays cacheable
+        system = prompt_service.get_system_blocks(kb_context)
+        if system:
+            body["system"] = system
+        
+        payload = orjson.dumps(body)
+        answer = await _cached(
+            _COMPLETION_CACHE,
+            ("llm", model_id, hashlib.blake2b(payload, digest_size=16).digest()),
+            lambda: run_in_threadpool(_complete, bedrock_client, model_id, payload)
         )
         
-        response_body = json.loads(response['body'].read())
-        
-        # Extract answer
-        answer = ""
-        if 'output' in response_body and 'message' in response_body['output']:
-            message = response_body['output']['message']
-            if 'content' in message and message['content']:
-                first_content = message['content'][0]
-                if 'text' in first_content:
-                    answer = first_content['text']
-        
         if not answer:
             answer = "I couldn't generate a response. Please try rephrasing your query."
         
-        return apply_guardrails(answer)
+        return await apply_guardrails_async(answer)
         
     except Exception as e:
         logger.error(f"LLM generation failed: {str(e)}")
@@ -320,18 +385,12 @@ async def search_documents(
 ) -> list:
     """Direct document search endpoint"""
     try:
-        kb = BedrockKB()
-        results = kb.retrieve_documents(
-            query=query,
-            max_results=max_results,
-            request_id=request_id,
-            user_id=user_id
-        )
+        results = await _retrieve_documents(query, max_results, request_id, user_id)
         
         documents = []
         for result in results:
             documents.append({
-                "content": result.content[:1000] + "..." if len(result.content) > 1000 else result.content,
+                "content": _truncate(result.content, 1000),
                 "source": result.source,
                 "score": result.score,
                 "metadata": result.metadata
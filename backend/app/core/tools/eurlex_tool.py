@@ -1,10 +1,77 @@
 # app/core/eurlex_tool.py
 
+import asyncio
+import threading
+import weakref
 import httpx
-from typing import Optional, Dict
+from types import MappingProxyType
+from typing import Optional, Dict, Tuple
 from loguru import logger
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
 
+from app.core.cache import TTLCache
+
+try:
+    import lxml  # noqa: F401 - only needed so BeautifulSoup can use it
+    _HTML_PARSER = "lxml"
+except ImportError:
+    _HTML_PARSER = "html.parser"
+
+# Resolved once instead of on every parse. Passing the class rather than an instance
+# matters because a builder holds per-parse state and run() parses on its own thread
+_HTML_BUILDER = builder_registry.lookup(_HTML_PARSER)
+
+# Only the elements read below are built into the tree, the rest of the page is skipped
+_REGULATION_STRAINER = SoupStrainer(["h1", "title", "div", "p"])
+_SEARCH_RESULT_STRAINER = SoupStrainer("div", class_="SearchResult")
+
+# Matchers for the lookups below, built once; find() uses a SoupStrainer as given
+# instead of compiling its name/class arguments into a new one on every call
+_TITLE_HEADING = SoupStrainer("h1", class_="title")
+_TITLE_TAG = SoupStrainer("title")
+_DOC_INFO = SoupStrainer("div", class_="doc-ti")
+_SUMMARY = SoupStrainer("p", class_="sti-summary")
+_PARAGRAPH = SoupStrainer("p")
+_RESULT_TITLE = SoupStrainer("a", class_="title")
+_RESULT_CELEX = SoupStrainer("span", class_="celex")
+
+# EUR-Lex DTS_DOM codes for the doc_type search filter
+_DOC_TYPE_CODES = MappingProxyType({
+    "regulation": "32",
+    "directive": "31",
+    "decision": "33"
+})
+
+try:
+    import h2  # noqa: F401 - httpx needs it for http2=True
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Keep-alive connections to eur-lex.europa.eu are reused across calls. httpx
+# already asks for br/gzip and decodes them (br once the brotli extra is installed)
+_POOL_LIMITS = httpx.Limits(max_keepalive_connections=20, keepalive_expiry=30)
+_CLIENT_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml",
+    "User-Agent": "EUComplianceAssistant/0.4",
+}
+
+# How long an HTTP error outcome is cached: long for a CELEX that does not
+# exist, short for server trouble unless the server says when to come back
+_MISSING_TTL = 300.0
+_SERVER_ERROR_TTL = 30.0
+
+def _negative_ttl(response: httpx.Response) -> float:
+    status_code = response.status_code
+    if status_code in (429, 503):
+        try:
+            return min(float(response.headers["retry-after"]), _MISSING_TTL)
+        except (KeyError, ValueError):
+            return _SERVER_ERROR_TTL
+    if status_code >= 500:
+        return _SERVER_ERROR_TTL
+    return _MISSING_TTL
 
 class EURLexTool:
     """Tool for fetching EU regulations by CELEX number from EUR-Lex"""
@@ -23,6 +90,43 @@ class EURLexTool:
     def __init__(self):
         self.base_url = "https://eur-lex.europa.eu/legal-content/EN/TXT/"
         self.timeout = 10.0
+        # An AsyncClient's connections belong to the loop that opened them, so
+        # each loop gets its own pooled client, built on first use
+        self._clients = weakref.WeakKeyDictionary()
+        # Loop that serves the synchronous run() wrapper, started on first use
+        self._sync_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync_loop_lock = threading.Lock()
+        # Published acts rarely change; a day keeps repeat lookups off the network
+        self._cache = TTLCache(maxsize=256, ttl=24 * 3600)
+        # Concurrent misses for one CELEX share a single fetch (futures are per loop)
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+    
+    def _get_sync_loop(self) -> asyncio.AbstractEventLoop:
+        with self._sync_loop_lock:
+            if self._sync_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="eurlex-loop", daemon=True).start()
+                self._sync_loop = loop
+            return self._sync_loop
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=_POOL_LIMITS,
+                headers=_CLIENT_HEADERS,
+                http2=HTTP2_AVAILABLE
+            )
+            self._clients[loop] = client
+        return client
+    
+    async def aclose(self):
+        """Close the pooled client of the running loop"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
     
     async def fetch_regulation(self, celex_number: str) -> Dict[str, str]:
         """
@@ -34,28 +138,64 @@ class EURLexTool:
         Returns:
             Dictionary with regulation details
         """
+        cached = self._cache.get(celex_number)
+        if cached is not None:
+            logger.debug(f"EUR-Lex cache hit: {celex_number}")
+            return cached
+        
+        key = (asyncio.get_running_loop(), celex_number)
+        pending = self._inflight.get(key)
+        while pending is not None:
+            # As in the orchestrator's _cached: wait() neither cancels the shared
+            # future nor raises when the caller that owns it was cancelled
+            await asyncio.wait((pending,))
+            if not pending.cancelled():
+                return pending.result()
+            # Its owner went away mid-fetch; take over (or join whoever already did)
+            pending = self._inflight.get(key)
+        
+        future = key[0].create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._fetch_regulation(celex_number)
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            if result["status"] == "success":
+                self._cache.set(celex_number, result)
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+    
+    async def _fetch_regulation(self, celex_number: str) -> Dict[str, str]:
         try:
             url = f"{self.base_url}?uri=CELEX:{celex_number}"
             
             logger.info(f"Fetching regulation from EUR-Lex: {celex_number}")
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(url)
-                response.raise_for_status()
+            response = await self._get_client().get(url)
+            response.raise_for_status()
             
-            # Parse HTML content
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Raw bytes go straight to the parser; a charset from Content-Type spares the sniffing
+            soup = BeautifulSoup(
+                response.content,
+                builder=_HTML_BUILDER,
+                parse_only=_REGULATION_STRAINER,
+                from_encoding=response.charset_encoding
+            )
             
             # Extract title
-            title_elem = soup.find('h1', class_='title') or soup.find('title')
+            title_elem = soup.find(_TITLE_HEADING) or soup.find(_TITLE_TAG)
             title = title_elem.get_text(strip=True) if title_elem else "Title not found"
             
             # Extract document type and date
-            doc_info = soup.find('div', class_='doc-ti')
+            doc_info = soup.find(_DOC_INFO)
             doc_type = doc_info.get_text(strip=True) if doc_info else "Unknown"
             
             # Extract summary or first paragraph
-            summary_elem = soup.find('p', class_='sti-summary') or soup.find('p')
+            summary_elem = soup.find(_SUMMARY) or soup.find(_PARAGRAPH)
             summary = summary_elem.get_text(strip=True)[:500] if summary_elem else "Summary not available"
             
             result = {
@@ -72,12 +212,15 @@ class EURLexTool:
             
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error fetching {celex_number}: {e}")
-            return {
+            result = {
                 "celex_number": celex_number,
                 "error": f"Regulation not found (HTTP {e.response.status_code})",
                 "status": "error",
                 "url": url
             }
+            # Remember the failure briefly so retries of a bad CELEX stay off the wire
+            self._cache.set(celex_number, result, ttl=_negative_ttl(e.response))
+            return result
         except Exception as e:
             logger.error(f"Error fetching regulation {celex_number}: {e}")
             return {
@@ -119,29 +262,28 @@ class EURLexTool:
                 params["DD_YEAR"] = str(year)
             
             if doc_type:
-                doc_type_map = {
-                    "regulation": "32",
-                    "directive": "31", 
-                    "decision": "33"
-                }
-                params["DTS_DOM"] = doc_type_map.get(doc_type.lower(), "")
+                params["DTS_DOM"] = _DOC_TYPE_CODES.get(doc_type.lower(), "")
             
             logger.info(f"Searching EUR-Lex: {query}")
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(search_url, params=params)
-                response.raise_for_status()
+            response = await self._get_client().get(search_url, params=params)
+            response.raise_for_status()
             
             # Parse search results
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = BeautifulSoup(
+                response.content,
+                builder=_HTML_BUILDER,
+                parse_only=_SEARCH_RESULT_STRAINER,
+                from_encoding=response.charset_encoding
+            )
             
             # Extract first few results
             results = []
-            result_items = soup.find_all('div', class_='SearchResult')[:5]
+            result_items = soup.find_all(_SEARCH_RESULT_STRAINER, limit=5)
             
             for item in result_items:
-                title_elem = item.find('a', class_='title')
-                celex_elem = item.find('span', class_='celex')
+                title_elem = item.find(_RESULT_TITLE)
+                celex_elem = item.find(_RESULT_CELEX)
                 
                 if title_elem and celex_elem:
                     results.append({
@@ -175,9 +317,10 @@ class EURLexTool:
         Returns:
             Formatted string with regulation details
         """
-        import asyncio
-        
-        result = asyncio.run(self.fetch_regulation(celex_number))
+        # The long-lived loop keeps its pooled client, so successive calls reuse connections
+        result = asyncio.run_coroutine_threadsafe(
+            self.fetch_regulation(celex_number), self._get_sync_loop()
+        ).result()
         
         if result["status"] == "success":
             return f"""
@@ -199,7 +342,7 @@ eurlex_tool = EURLexTool()
 
 
 # Common CELEX numbers for quick reference
-COMMON_REGULATIONS = {
+COMMON_REGULATIONS = MappingProxyType({
     "gdpr": "32016R0679",
     "csrd": "32022L2464", 
     "eu_taxonomy": "32020R0852",
@@ -207,7 +350,7 @@ COMMON_REGULATIONS = {
     "dma": "32022R1925",
     "ai_act": "32024R1689",
     "nis2": "32022L2555"
-}
+})
 
 
 def get_celex_by_name(regulation_name: str) -> Optional[str]:
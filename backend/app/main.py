@@ -1,11 +1,15 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.exceptions import RequestValidationError
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from contextlib import asynccontextmanager
 import os
+import orjson
 
+from app.config import settings
 from app.core.logging_config import logging_config, app_logger
 from app.core.error_handler import (
     ErrorHandler, 
@@ -15,8 +19,8 @@ from app.core.error_handler import (
     RateLimitError
 )
 from app.api import routes_chat, routes_auth, routes_safety
-from app.services.bedrock_kb import EnhancedBedrockKB
-from app.core.middleware import setup_middlewares
+from app.services.bedrock_kb import get_kb
+from app.core.middleware import setup_middlewares, StaticResponseMiddleware
 
 
 @asynccontextmanager
@@ -38,7 +42,7 @@ async def lifespan(app: FastAPI):
         app_logger.warning(f"⚠️ Could not initialize guardrails: {str(e)}")
     
     try:
-        kb = EnhancedBedrockKB()
+        kb = get_kb()
         health_status = kb.health_check()
         
         if health_status["status"] == "healthy":
@@ -64,25 +68,46 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     app_logger.info(" Legal AI Assistant shutting down...")
+    from app.services.langsmith_service import langsmith_service
+    langsmith_service.flush()
+    from app.core.tools.eurlex_tool import eurlex_tool
+    await eurlex_tool.aclose()
+    # Flush records still queued for the file sinks
+    await app_logger.complete()
 
 
 app = FastAPI(
     title="Legal AI Assistant",
     version="0.4",
     description="Enhanced Legal AI Assistant with comprehensive logging and improved RAG functionality",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
+CORS_ORIGINS = [
+    "http://localhost:3000",
+    "http://127.0.0.1:3000",
+    "http://localhost:8080",
+    "http://127.0.0.1:8080",
+    "http://localhost:8000",  
+    "http://127.0.0.1:8000"
+]
+
+setup_middlewares(app, {
+    "api_version": "0.4",
+    "max_request_size": 10 * 1024 * 1024,  # 10MB
+    "enable_rate_limiting": True,
+    "rate_limit_rpm": 100,
+    "redis_url": settings.REDIS_URL,
+    "enable_security_headers": True,
+    "skip_cors": True
+})
+
+# Outside the middlewares above, so responses they replay from a cache (the
+# /health snapshot) still get CORS headers for the current caller
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",
-        "http://127.0.0.1:3000",
-        "http://localhost:8080",
-        "http://127.0.0.1:8080",
-        "http://localhost:8000",  
-        "http://127.0.0.1:8000"
-    ],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "HEAD"],
     allow_headers=["*"],
@@ -91,14 +116,13 @@ app.add_middleware(
 
 app_logger.info("CORS middleware configured for cross-origin requests")
 
-setup_middlewares(app, {
-    "api_version": "0.4",
-    "max_request_size": 10 * 1024 * 1024,  # 10MB
-    "enable_rate_limiting": True,
-    "rate_limit_rpm": 100,
-    "enable_security_headers": True,
-    "skip_cors": True  
-})
+# Added last so it is outermost and answers before every middleware above;
+# it sets the CORS headers for these replies itself
+app.add_middleware(
+    StaticResponseMiddleware,
+    responses={f"/v1{path}": body for path, body in routes_safety.STATIC_RESPONSES.items()},
+    allowed_origins=CORS_ORIGINS
+)
 
 app.add_exception_handler(StarletteHTTPException, ErrorHandler.http_exception_handler)
 app.add_exception_handler(RequestValidationError, ErrorHandler.validation_exception_handler)
@@ -122,13 +146,15 @@ async def rate_limit_exception_handler(request: Request, exc: RateLimitError):
 
 app.include_router(routes_auth.router)
 app.include_router(routes_chat.router, prefix="/v1", tags=["chat"])
+if settings.DEBUG:
+    app.include_router(routes_chat.debug_router, prefix="/v1", tags=["debug"])
 app.include_router(routes_safety.router, prefix="/v1", tags=["safety"])
 
 @app.get("/health", tags=["Health"])
 async def health_check():
     try:
-        kb = EnhancedBedrockKB()
-        kb_status = kb.health_check()
+        # The probe is a real Retrieve call against the KB; keep it off the event loop
+        kb_status = await run_in_threadpool(get_kb().health_check)
         
         overall_status = "healthy"
         if kb_status["status"] == "unhealthy":
@@ -166,37 +192,42 @@ async def health_check():
             "cors": {"status": "enabled"}
         }
 
+# Constant bodies, serialized once at import instead of on every request
+_CORS_TEST_BODY = orjson.dumps({
+    "message": "CORS is working!",
+    "cors_enabled": True,
+    "server": "FastAPI Legal AI Assistant",
+    "version": "0.4"
+})
+
+_API_ROOT_BODY = orjson.dumps({
+    "message": "Legal AI Assistant API",
+    "version": "0.4",
+    "status": "running",
+    "docs": "/docs",
+    "health": "/health",
+    "cors_test": "/cors-test",
+    "endpoints": {
+        "chat": "/v1/chat",
+        "search": "/v1/search", 
+        "login": "/auth/login",
+        "profile": "/auth/me"
+    },
+    "cors": {
+        "enabled": True,
+        "note": "Cross-origin requests from localhost:3000 are allowed"
+    }
+})
+
 @app.get("/cors-test", tags=["Debug"])
 async def cors_test():
-    return {
-        "message": "CORS is working!",
-        "cors_enabled": True,
-        "server": "FastAPI Legal AI Assistant",
-        "version": "0.4"
-    }
+    return Response(_CORS_TEST_BODY, media_type="application/json")
 
 # Root endpoint
 @app.get("/api", tags=["Root"])
 async def api_root():
     """API root endpoint with basic information"""
-    return {
-        "message": "Legal AI Assistant API",
-        "version": "0.4",
-        "status": "running",
-        "docs": "/docs",
-        "health": "/health",
-        "cors_test": "/cors-test",
-        "endpoints": {
-            "chat": "/v1/chat",
-            "search": "/v1/search", 
-            "login": "/auth/login",
-            "profile": "/auth/me"
-        },
-        "cors": {
-            "enabled": True,
-            "note": "Cross-origin requests from localhost:3000 are allowed"
-        }
-    }
+    return Response(_API_ROOT_BODY, media_type="application/json")
 
 # Mount static files for frontend
 # Create these directories if they don't exist
@@ -217,21 +248,23 @@ if os.path.exists(frontend_dir):
     app.mount("/", StaticFiles(directory=frontend_dir, html=True), name="frontend")
     app_logger.info(f"Frontend files mounted from: {frontend_dir}")
 else:
+    _ROOT_BODY = orjson.dumps({
+        "message": "Legal AI Assistant",
+        "version": "0.4",
+        "status": "running",
+        "api_docs": "/docs",
+        "health": "/health",
+        "cors_test": "/cors-test",
+        "note": "Frontend files not found. API endpoints are available.",
+        "cors": {
+            "enabled": True,
+            "frontend_urls": [
+                "http://localhost:3000",
+                "http://127.0.0.1:3000"
+            ]
+        }
+    })
+
     @app.get("/")
     async def root():
-        return {
-            "message": "Legal AI Assistant",
-            "version": "0.4",
-            "status": "running",
-            "api_docs": "/docs",
-            "health": "/health",
-            "cors_test": "/cors-test",
-            "note": "Frontend files not found. API endpoints are available.",
-            "cors": {
-                "enabled": True,
-                "frontend_urls": [
-                    "http://localhost:3000",
-                    "http://127.0.0.1:3000"
-                ]
-            }
-        }
\ No newline at end of file
+        return Response(_ROOT_BODY, media_type="application/json")
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Any, Dict
 from datetime import datetime
 
@@ -11,7 +11,7 @@ class ChatResponse(BaseModel):
     citations: List[Citation] = []
     tool_used: Optional[str] = None
     session_id: Optional[str] = None  # Add session ID to response
-    timestamp: datetime = datetime.now()
+    timestamp: datetime = Field(default_factory=datetime.now)  # Stamped per response, not at import
 
 class SearchResponse(BaseModel):
     query: str
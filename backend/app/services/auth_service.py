@@ -1,8 +1,11 @@
 # app/services/auth_service.py
-import hashlib, secrets
+import asyncio, hashlib, hmac, secrets, time
+from typing import Optional
+from functools import lru_cache
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from fastapi import HTTPException, Depends, status, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBasic, HTTPBasicCredentials, HTTPBearer
 from loguru import logger
 
@@ -10,22 +13,50 @@ from app.models.auth_models import LoginRequest, TokenResponse
 from app.config import settings
 from app.core.error_handler import AuthenticationError
 from app.core.logging_config import LoggingConfig
+from app.core.cache import TTLCache
 
 security = HTTPBasic()
 security_jwt = HTTPBearer()
 
+# Verified token digest -> username, held no longer than the token itself is valid.
+# Keyed on a digest so raw bearer tokens are not retained in memory.
+_token_cache = TTLCache(maxsize=8192, ttl=300)
+
+_JWT_ALGORITHM = "HS256"
+_JWT_ALGORITHMS = [_JWT_ALGORITHM]
+_SESSION_SIGNING_KEY = settings.SECRET_KEY.encode("utf-8")
+
+# Every login answer takes at least this long, so success and failure look alike
+_LOGIN_MIN_DURATION = 0.25
+
+def _token_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+# scrypt cost parameters: ~16 MB and tens of milliseconds per hash
+_SCRYPT_PARAMS = {"n": 2 ** 14, "r": 8, "p": 1, "dklen": 32}
+
 def hash_password_with_salt(password: str) -> str:
     try:
-        return hashlib.sha256((password + settings.PASSWORD_SALT).encode("utf-8")).hexdigest()
+        return hashlib.scrypt(
+            password.encode("utf-8"),
+            salt=settings.PASSWORD_SALT.encode("utf-8"),
+            **_SCRYPT_PARAMS
+        ).hex()
     except Exception as e:
         logger.error(f"Password hashing failed: {str(e)}")
         raise AuthenticationError("Authentication processing error")
 
+@lru_cache(maxsize=1)
+def _admin_password_hash() -> str:
+    # The configured password never changes at runtime, so it is stretched once
+    return hash_password_with_salt(settings.ADMIN_PASSWORD)
+
 def create_access_token(username: str) -> str:
     try:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        data = {"sub": username, "exp": expire, "iat": datetime.utcnow()}
-        token = jwt.encode(data, settings.SECRET_KEY, algorithm="HS256")
+        issued_at = datetime.utcnow()
+        expire = issued_at + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        data = {"sub": username, "exp": expire, "iat": issued_at}
+        token = jwt.encode(data, settings.SECRET_KEY, algorithm=_JWT_ALGORITHM)
         
         logger.info(f"Access token created for user: {username} | Expires: {expire}")
         return token
@@ -35,8 +66,14 @@ def create_access_token(username: str) -> str:
         raise AuthenticationError("Token creation failed")
 
 def verify_jwt_token(token: str) -> str:
+    token_key = _token_key(token)
+    cached_username = _token_cache.get(token_key)
+    if cached_username is not None:
+        return cached_username
+
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        # jose rejects an expired exp claim itself (ExpiredSignatureError is a JWTError)
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=_JWT_ALGORITHMS, options={"verify_exp": True})
         username = payload.get("sub")
         
         if not username:
@@ -44,9 +81,10 @@ def verify_jwt_token(token: str) -> str:
             raise AuthenticationError("Invalid token: missing user information")
         
         exp = payload.get("exp")
-        if exp and datetime.utcnow() > datetime.fromtimestamp(exp):
-            logger.warning(f"Token verification failed: expired token for user {username}")
-            raise AuthenticationError("Token has expired")
+        ttl = _token_cache.ttl
+        if exp:
+            ttl = min(ttl, exp - time.time())
+        _token_cache.set(token_key, username, ttl=ttl)
         
         return username
         
@@ -60,7 +98,7 @@ def verify_jwt_token(token: str) -> str:
 def verify_credentials(username: str, password: str, ip_address: str = None) -> bool:
     try:
         entered_password_hash = hash_password_with_salt(password)
-        correct_password_hash = hash_password_with_salt(settings.ADMIN_PASSWORD)
+        correct_password_hash = _admin_password_hash()
 
         is_correct_username = secrets.compare_digest(username, settings.ADMIN_USERNAME)
         is_correct_password = secrets.compare_digest(entered_password_hash, correct_password_hash)
@@ -106,9 +144,31 @@ def get_client_ip(request: Request = None) -> str:
     
     return "unknown"
 
-def get_current_user(credentials=Depends(security_jwt)) -> str:
+def _sign_session(payload: str) -> str:
+    return hmac.new(_SESSION_SIGNING_KEY, payload.encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+def create_session_id(username: str) -> str:
+    """Issue a session id of the form user:nonce:signature"""
+    payload = f"{username}:{secrets.token_hex(16)}"
+    return f"{payload}:{_sign_session(payload)}"
+
+def get_session_owner(session_id: str) -> Optional[str]:
+    """Return the user a signed session id was issued to, or None if it is unsigned or tampered with"""
+    payload, _, signature = session_id.rpartition(":")
+    if not payload or not hmac.compare_digest(signature.encode("utf-8"), _sign_session(payload).encode("utf-8")):
+        return None
+    owner, _, _ = payload.rpartition(":")
+    return owner or None
+
+def get_current_user(request: Request, credentials=Depends(security_jwt)) -> str:
+    cached_user = getattr(request.state, "current_user", None)
+    if cached_user is not None:
+        return cached_user
+
     try:
         username = verify_jwt_token(credentials.credentials)
+        request.state.current_user = username
+        request.state.log = LoggingConfig.get_request_logger(request).bind(user_id=username)
         return username
     except AuthenticationError:
         raise HTTPException(
@@ -118,6 +178,7 @@ def get_current_user(credentials=Depends(security_jwt)) -> str:
         )
 
 async def login(login_data: LoginRequest, request: Request = None) -> TokenResponse:
+    started = time.perf_counter()
     client_ip = get_client_ip(request)
     
     try:
@@ -129,9 +190,8 @@ async def login(login_data: LoginRequest, request: Request = None) -> TokenRespo
         if len(login_data.username) > 100 or len(login_data.password) > 1000:
             raise AuthenticationError("Invalid credentials format")
         
-        if not verify_credentials(login_data.username, login_data.password, client_ip):
-            import asyncio
-            await asyncio.sleep(1)
+        # The KDF is deliberately slow; keep it off the event loop
+        if not await run_in_threadpool(verify_credentials, login_data.username, login_data.password, client_ip):
             raise AuthenticationError("Invalid username or password")
 
         token = create_access_token(login_data.username)
@@ -151,6 +211,8 @@ async def login(login_data: LoginRequest, request: Request = None) -> TokenRespo
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Authentication service temporarily unavailable"
         )
+    finally:
+        await asyncio.sleep(max(0.0, _LOGIN_MIN_DURATION - (time.perf_counter() - started)))
 
 def verify_token_health() -> dict:
     try:
@@ -1,8 +1,61 @@
 # app/services/bedrock_client.py
 import boto3
+from botocore.config import Config
 from functools import lru_cache
+from typing import Optional
+from loguru import logger
 from app.config import settings
 
+# Open response streams are read on their own limiter (streaming._iterate_in_thread),
+# so long generations never hold the threadpool's workers; this caps concurrent streams
+MAX_STREAM_READERS = 64
+# anyio's default threadpool size, which bounds every other offloaded Bedrock call
+_THREADPOOL_WORKERS = 40
+
+# Shared by every caller of the cached clients: reused TCP connections and adaptive
+# backoff on throttling. The pool has a connection for every threadpool worker and
+# every stream reader, so neither ever waits for one
+_CLIENT_CONFIG = Config(
+    retries={"mode": "adaptive", "max_attempts": 3},
+    max_pool_connections=_THREADPOOL_WORKERS + MAX_STREAM_READERS,
+    tcp_keepalive=True,
+    connect_timeout=2,
+    read_timeout=60,
+)
+
+# Cross-region inference profile for Nova Pro, by region prefix
+_INFERENCE_PROFILES = {
+    "eu": "eu.amazon.nova-pro-v1:0",
+    "ap": "apac.amazon.nova-pro-v1:0",
+    "us": "us.amazon.nova-pro-v1:0",
+}
+
+
+@lru_cache(maxsize=1)
+def get_model_id_or_inference_profile() -> str:
+    # Settings are frozen, so the resolved id never changes after the first call
+    custom_model = settings.BEDROCK_GENERATION_MODEL
+    if custom_model and custom_model.startswith(('us.', 'eu.', 'apac.', 'arn:aws:bedrock')):
+        model_id = custom_model
+    else:
+        region = settings.AWS_REGION or 'us-east-1'
+        model_id = _INFERENCE_PROFILES.get(region.split('-', 1)[0], _INFERENCE_PROFILES["eu"])
+    
+    logger.info(f"Using Bedrock model: {model_id}")
+    return model_id
+
+
+def log_token_usage(usage: Optional[dict]):
+    """Debug-log the token usage of a messages-v1 response, prompt cache reads included"""
+    if usage:
+        logger.debug(
+            "Bedrock usage | Input: {} | Output: {} | Cache read: {} | Cache write: {}",
+            usage.get("inputTokens"),
+            usage.get("outputTokens"),
+            usage.get("cacheReadInputTokenCount", 0),
+            usage.get("cacheWriteInputTokenCount", 0)
+        )
+
 
 @lru_cache(maxsize=1)
 def get_bedrock_client():
@@ -11,6 +64,7 @@ def get_bedrock_client():
         region_name=settings.AWS_REGION,
         aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
         aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        config=_CLIENT_CONFIG,
     )
 
 
@@ -21,6 +75,7 @@ def get_bedrock_agent_client():
         region_name=settings.AWS_REGION,
         aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
         aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        config=_CLIENT_CONFIG,
     )
 
 
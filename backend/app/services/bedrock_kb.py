@@ -3,8 +3,10 @@ import os
 import time
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain
 from enum import Enum
-import boto3
+from types import MappingProxyType
 from botocore.exceptions import ClientError, BotoCoreError
 from loguru import logger
 
@@ -15,12 +17,16 @@ from app.core.error_handler import KnowledgeBaseError
 from app.core.logging_config import LoggingConfig
 
 
+# Read-only default for lookups whose result is not kept
+_EMPTY = MappingProxyType({})
+
+
 class RetrievalType(Enum):
     VECTOR = "VECTOR"
     HYBRID = "HYBRID"
 
 
-@dataclass
+@dataclass(slots=True)
 class RetrievalResult:
     content: str
     source: str
@@ -29,7 +35,7 @@ class RetrievalResult:
     location: Dict[str, Any]
 
 
-@dataclass
+@dataclass(slots=True)
 class GenerationResult:
     answer: str
     citations: List[RetrievalResult]
@@ -38,6 +44,26 @@ class GenerationResult:
     guardrails_applied: bool = False
 
 
+# Values from the sample .env that mean no real knowledge base is configured
+_PLACEHOLDER_KB_MARKERS = ("your-actual-knowledge-base-id",)
+
+
+def _is_placeholder_kb_id(kb_id: Optional[str]) -> bool:
+    return not kb_id or not kb_id.strip() or any(marker in kb_id for marker in _PLACEHOLDER_KB_MARKERS)
+
+
+def _to_retrieval_result(item: Dict[str, Any], score: float) -> RetrievalResult:
+    """Build a result from a retrievalResults item or a citation's retrievedReference"""
+    location = item.get("location") or {}
+    return RetrievalResult(
+        content=item.get("content", _EMPTY).get("text", ""),
+        source=location.get("s3Location", _EMPTY).get("uri", "Unknown"),
+        score=score,
+        metadata=item.get("metadata") or {},
+        location=location
+    )
+
+
 class MockBedrockKB:    
     def __init__(self):
         self.kb_id = "mock-kb"
@@ -101,7 +127,7 @@ class EnhancedBedrockKB:
         self.kb_id = kb_id or settings.BEDROCK_KNOWLEDGE_BASE_ID
         self.model_id = model_id or settings.BEDROCK_GENERATION_MODEL
         
-        if not self.kb_id or self.kb_id.strip() == "" or "your-actual-knowledge-base-id" in self.kb_id:
+        if _is_placeholder_kb_id(self.kb_id):
             logger.warning(f"Invalid BEDROCK_KNOWLEDGE_BASE_ID: '{self.kb_id}'. Using mock KB for development.")
             self.mock_kb = MockBedrockKB()
             self.is_mock = True
@@ -132,9 +158,10 @@ class EnhancedBedrockKB:
         request_id: str = None,
         user_id: str = None
     ) -> List[RetrievalResult]:
+        log = logger.bind(request_id=request_id, user_id=user_id)
         
         if self.is_mock:
-            logger.bind(request_id=request_id, user_id=user_id).info(
+            log.info(
                 f"Using mock KB retrieval for query: {query[:50]}..."
             )
             return self.mock_kb.retrieve_documents(query, max_results=max_results)
@@ -142,7 +169,7 @@ class EnhancedBedrockKB:
         start_time = time.time()
         
         try:
-            logger.bind(request_id=request_id, user_id=user_id).info(
+            log.info(
                 f"Starting KB retrieval | Query: {query[:100]}... | Max results: {max_results}"
             )
             
@@ -177,11 +204,11 @@ class EnhancedBedrockKB:
         except ClientError as e:
             error_code = e.response['Error']['Code']
             error_msg = f"AWS Bedrock error ({error_code}): {e.response['Error']['Message']}"
-            logger.bind(request_id=request_id, user_id=user_id).error(error_msg)
+            log.error(error_msg)
             raise KnowledgeBaseError(error_msg)
         except Exception as e:
             error_msg = f"Unexpected error during retrieval: {str(e)}"
-            logger.bind(request_id=request_id, user_id=user_id).error(error_msg)
+            log.error(error_msg)
             raise KnowledgeBaseError(error_msg)
 
     @langsmith_service.trace(
@@ -199,8 +226,9 @@ class EnhancedBedrockKB:
         user_id: str = None,
         system_prompt: str = None
     ) -> GenerationResult:        
+        log = logger.bind(request_id=request_id, user_id=user_id)
         if self.is_mock:
-            logger.bind(request_id=request_id, user_id=user_id).info(
+            log.info(
                 f"Using mock KB generation for query: {query[:50]}..."
             )
             return self.mock_kb.generate_response(query)
@@ -209,7 +237,7 @@ class EnhancedBedrockKB:
         model = model_id or self.model_id
         
         try:
-            logger.bind(request_id=request_id, user_id=user_id).info(
+            log.info(
                 f"Starting RAG generation | Model: {model} | Session: {session_id} (will be ignored)"
             )
             
@@ -234,20 +262,20 @@ class EnhancedBedrockKB:
                         "textPromptTemplate": system_prompt + "\n\nHuman: $query$\n\nAssistant:"
                     }
                 }
-                logger.bind(request_id=request_id, user_id=user_id).info("Using custom prompt template")
+                log.info("Using custom prompt template")
             else:
                 if system_prompt:
-                    logger.bind(request_id=request_id, user_id=user_id).warning(
+                    log.warning(
                         "System prompt missing $search_results$ placeholder. Using default."
                     )
-                logger.bind(request_id=request_id, user_id=user_id).info("Using default Bedrock KB prompt template")
+                log.info("Using default Bedrock KB prompt template")
             
             request_params = {
                 "input": {"text": query},
                 "retrieveAndGenerateConfiguration": config
             }
             
-            logger.bind(request_id=request_id, user_id=user_id).info(
+            log.info(
                 "Making Bedrock call WITHOUT session ID to avoid validation errors"
             )
             
@@ -256,7 +284,7 @@ class EnhancedBedrockKB:
             duration = time.time() - start_time
             result = self._parse_generation_result(response)
             
-            logger.bind(request_id=request_id, user_id=user_id).info(
+            log.info(
                 f"RAG generation completed | Duration: {duration:.3f}s | Citations: {len(result.citations)}"
             )
             
@@ -267,98 +295,36 @@ class EnhancedBedrockKB:
             error_msg = f"AWS Bedrock generation error ({error_code}): {e.response['Error']['Message']}"
             
             if error_code == 'ValidationException' and 'Session' in str(e):
-                logger.bind(request_id=request_id, user_id=user_id).error(
+                log.error(
                     f"Bedrock session validation failed: {error_msg}"
                 )
             else:
-                logger.bind(request_id=request_id, user_id=user_id).error(error_msg)
+                log.error(error_msg)
             
             raise KnowledgeBaseError(error_msg)
         except Exception as e:
             error_msg = f"Unexpected error during generation: {str(e)}"
-            logger.bind(request_id=request_id, user_id=user_id).error(error_msg)
+            log.error(error_msg)
             raise KnowledgeBaseError(error_msg)
 
-    @langsmith_service.trace(
-        name="kb_parse_retrieval_results",
-        run_type="parser",
-        metadata={"source": "bedrock_kb", "operation": "parse"}
-    )
     def _parse_retrieval_results(self, raw_results: List[Dict[str, Any]]) -> List[RetrievalResult]:
-        results = []
-        
-        for item in raw_results:
-            try:
-                content = item.get("content", {}).get("text", "")
-                location = item.get("location", {})
-                metadata = item.get("metadata", {})
-                score = item.get("score", 0.0)
-                
-                source = "Unknown"
-                if "s3Location" in location:
-                    source = location["s3Location"].get("uri", "Unknown")
-                elif "type" in location and location["type"] == "S3":
-                    source = location.get("s3Location", {}).get("uri", "Unknown")
-                
-                result = RetrievalResult(
-                    content=content,
-                    source=source,
-                    score=score,
-                    metadata=metadata,
-                    location=location
-                )
-                results.append(result)
-                
-            except Exception as e:
-                logger.warning(f"Failed to parse retrieval result: {str(e)} | Item: {item}")
-                continue
-        
-        return results
+        # botocore has already validated the response shape, so items are parsed without per-item guards
+        return [_to_retrieval_result(item, item.get("score", 0.0)) for item in raw_results]
 
-    @langsmith_service.trace(
-        name="kb_parse_generation_result",
-        run_type="parser",
-        metadata={"source": "bedrock_kb", "operation": "parse"}
-    )
     def _parse_generation_result(self, response: Dict[str, Any]) -> GenerationResult:
         try:
-            output = response.get("output", {})
-            answer = output.get("text", "Sorry, I could not generate a response.")
-            session_id = response.get("sessionId")
-            
-            citations = []
-            source_documents = []
+            answer = response.get("output", _EMPTY).get("text", "Sorry, I could not generate a response.")
             
-            for citation in response.get("citations", []):
-                for ref in citation.get("retrievedReferences", []):
-                    try:
-                        content = ref.get("content", {}).get("text", "")
-                        location = ref.get("location", {})
-                        metadata = ref.get("metadata", {})
-                        
-                        source = "Unknown"
-                        if "s3Location" in location:
-                            source = location["s3Location"].get("uri", "Unknown")
-                        
-                        citation_result = RetrievalResult(
-                            content=content,
-                            source=source,
-                            score=0.0,
-                            metadata=metadata,
-                            location=location
-                        )
-                        citations.append(citation_result)
-                        source_documents.append(ref)
-                        
-                    except Exception as e:
-                        logger.warning(f"Failed to parse citation: {str(e)}")
-                        continue
+            # Every reference of every citation, in order; the raw refs double as source_documents
+            refs = list(chain.from_iterable(
+                citation.get("retrievedReferences", ()) for citation in response.get("citations", ())
+            ))
             
             return GenerationResult(
                 answer=answer,
-                citations=citations,
-                source_documents=source_documents,
-                session_id=session_id
+                citations=[_to_retrieval_result(ref, 0.0) for ref in refs],
+                source_documents=refs,
+                session_id=response.get("sessionId")
             )
             
         except Exception as e:
@@ -402,4 +368,10 @@ class EnhancedBedrockKB:
             }
 
 
-BedrockKB = EnhancedBedrockKB
\ No newline at end of file
+BedrockKB = EnhancedBedrockKB
+
+
+@lru_cache(maxsize=1)
+def get_kb() -> EnhancedBedrockKB:
+    """Shared KB client; constructing one per request rebuilds its Bedrock clients"""
+    return EnhancedBedrockKB()
@@ -1,10 +1,14 @@
-import os
-from langchain_community.chat_models import BedrockChat
+from functools import lru_cache
+from langchain_aws import ChatBedrockConverse
 
+from app.config import settings
+from app.services.bedrock_client import get_bedrock_client, get_model_id_or_inference_profile
+
+@lru_cache(maxsize=1)
 def get_bedrock_llm():
-    model_id = os.getenv("BEDROCK_GENERATION_MODEL", "anthropic.claude-v2")
-    return BedrockChat(
-        model_id=model_id,
-        client=None,
-        region_name="eu-central-1",
+    # Converse API wrapper; reuses the shared runtime client instead of building its own
+    return ChatBedrockConverse(
+        model=get_model_id_or_inference_profile(),
+        client=get_bedrock_client(),
+        region_name=settings.AWS_REGION,
     )
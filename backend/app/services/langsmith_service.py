@@ -1,4 +1,8 @@
-from typing import Optional, Dict, Any, Callable
+import os
+import inspect
+import random
+from contextvars import ContextVar
+from typing import Optional, Any, Callable, Mapping
 from functools import wraps
 from contextlib import contextmanager, asynccontextmanager
 from loguru import logger
@@ -13,6 +17,10 @@ except ImportError:
     LANGSMITH_AVAILABLE = False
     logger.warning("LangSmith not installed. Install with: pip install langsmith")
 
+# Sampling decision of the current request: made by the outermost sampled span and
+# inherited by everything it calls (child tasks copy it too), so a trace is whole or absent
+_trace_sampled: ContextVar[Optional[bool]] = ContextVar("langsmith_trace_sampled", default=None)
+
 
 class LangSmithService:
     
@@ -29,7 +37,11 @@ class LangSmithService:
                 logger.debug(f"LangSmith config check - Tracing: {tracing_enabled}, API key exists: {bool(api_key)}")
                 
                 if tracing_enabled and api_key:
-                    self.client = Client(api_key=api_key)
+                    # Runs are queued and posted in batches by the client's background
+                    # thread, so a traced call never waits on the LangSmith API
+                    self.client = Client(api_key=api_key, auto_batch_tracing=True)
+                    # LangChain callbacks (memory, chains) likewise report off the request path
+                    os.environ.setdefault("LANGCHAIN_CALLBACKS_BACKGROUND", "true")
                     self.enabled = True
                     logger.info(f"LangSmith monitoring enabled | Project: {project}")
                     
@@ -53,10 +65,15 @@ class LangSmithService:
     def trace(self, 
               name: str = None,
               run_type: str = "chain",
-              metadata: Optional[Dict[str, Any]] = None):
+              metadata: Optional[Mapping[str, Any]] = None,
+              sample_rate: Optional[float] = None,
+              enabled: bool = True):
+
+        if sample_rate is None:
+            sample_rate = settings.LANGSMITH_SAMPLE_RATE
 
         def decorator(func: Callable) -> Callable:
-            if not self.enabled:
+            if not self.enabled or not enabled or sample_rate <= 0:
                 logger.debug(f"Tracing disabled, skipping trace for {func.__name__}")
                 return func
             
@@ -65,12 +82,54 @@ class LangSmithService:
             traced_func = traceable(
                 run_type=run_type,
                 name=trace_name,
-                metadata=metadata or {},
-                project_name=settings.LANGCHAIN_PROJECT
+                metadata=dict(metadata) if metadata else {},
+                project_name=settings.LANGCHAIN_PROJECT,
+                client=self.client
             )(func)
             
-            logger.debug(f"Applied LangSmith trace to {trace_name}")
-            return traced_func
+            logger.debug(f"Applied LangSmith trace to {trace_name} | Sample rate: {sample_rate}")
+
+            if sample_rate >= 1:
+                return traced_func
+
+            # Head-based sampling: the entry span decides, nested spans follow it
+            def decide() -> bool:
+                decision = _trace_sampled.get()
+                return random.random() < sample_rate if decision is None else decision
+
+            if inspect.isasyncgenfunction(func):
+                @wraps(func)
+                async def sampled(*args, **kwargs):
+                    decision = decide()
+                    token = _trace_sampled.set(decision)
+                    try:
+                        async for item in (traced_func if decision else func)(*args, **kwargs):
+                            yield item
+                    finally:
+                        try:
+                            _trace_sampled.reset(token)
+                        except ValueError:
+                            pass  # Finalized from another context, which never saw the set
+            elif inspect.iscoroutinefunction(func):
+                @wraps(func)
+                async def sampled(*args, **kwargs):
+                    decision = decide()
+                    token = _trace_sampled.set(decision)
+                    try:
+                        return await (traced_func if decision else func)(*args, **kwargs)
+                    finally:
+                        _trace_sampled.reset(token)
+            else:
+                @wraps(func)
+                def sampled(*args, **kwargs):
+                    decision = decide()
+                    token = _trace_sampled.set(decision)
+                    try:
+                        return (traced_func if decision else func)(*args, **kwargs)
+                    finally:
+                        _trace_sampled.reset(token)
+
+            return sampled
         
         return decorator
     
@@ -94,6 +153,16 @@ class LangSmithService:
             logger.error(f"Error in trace context {name}: {e}")
             yield None
     
+    def flush(self):
+        """Send any runs still queued in the background batch"""
+        if not self.enabled or not self.client:
+            return
+        
+        try:
+            self.client.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush LangSmith runs: {e}")
+    
     def log_feedback(self, 
                      run_id: str, 
                      score: float, 
@@ -3,9 +3,9 @@ from typing import Optional, Dict, Any, List
 from langchain.memory import ConversationBufferWindowMemory
 from langchain.schema import BaseMessage, HumanMessage, AIMessage
 from langchain.memory.chat_memory import BaseChatMemory
-import json
 import time
-from dataclasses import dataclass
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
 from loguru import logger
 from requests import session
 
@@ -13,7 +13,7 @@ from app.config import settings
 from app.services.langsmith_service import langsmith_service
 
 
-@dataclass
+@dataclass(slots=True)
 class ChatSession:
     session_id: str
     user_id: str
@@ -21,12 +21,22 @@ class ChatSession:
     last_activity: float
     memory: BaseChatMemory
     metadata: Dict[str, Any]
+    # The same history already in Bedrock messages-v1 form, maintained by add_message
+    bedrock_messages: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def message_count(self) -> int:
+        # Every memory built by _create_memory is a BaseChatMemory
+        return len(self.memory.chat_memory.messages)
 
 
 class ChatMemoryService:
     
     def __init__(self):
-        self.sessions: Dict[str, ChatSession] = {}
+        # Kept in last-activity order (oldest first), so cleanup only ever looks at the front
+        self.sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        # user_id -> {session_id: None}; a dict keeps creation order, as the full scan used to
+        self._by_user: Dict[str, Dict[str, None]] = defaultdict(dict)
         self.cleanup_interval = 3600  # 1 hour
         self.session_timeout = 7200   # 2 hours
         self.max_sessions = 1000      # Memory limit
@@ -49,6 +59,7 @@ class ChatMemoryService:
         if session_id in self.sessions:
             session = self.sessions[session_id]
             session.last_activity = time.time()
+            self.sessions.move_to_end(session_id)
             logger.debug(f"Retrieved existing session: {session_id} with {len(session.memory.chat_memory.messages)} messages")
             return session
         
@@ -64,16 +75,12 @@ class ChatMemoryService:
         )
         
         self.sessions[session_id] = session
+        self._by_user[user_id][session_id] = None
         self._cleanup_old_sessions()
         
         logger.info(f"Created new chat session: {session_id} for user: {user_id} | Type: {memory_type}")
         return session
     
-    @langsmith_service.trace(
-        name="memory_create_memory",
-        run_type="tool",
-        metadata={"operation": "memory_initialization"}
-    )
     def _create_memory(self, memory_type: str, **kwargs) -> BaseChatMemory:
 
         if memory_type == "buffer_window":
@@ -94,11 +101,6 @@ class ChatMemoryService:
             logger.debug("Created default buffer window memory")
             return memory
     
-    @langsmith_service.trace(
-        name="memory_add_message",
-        run_type="tool",
-        metadata={"operation": "add_message", "service": "memory"}
-    )
     def add_message(self, session_id: str, human_message: str, ai_message: str, replace_last: bool = False):
         if session_id not in self.sessions:
             logger.warning(f"Session {session_id} not found when trying to add message")
@@ -110,26 +112,28 @@ class ChatMemoryService:
             if len(session.memory.chat_memory.messages) >= 2:
                 session.memory.chat_memory.messages.pop()  # Remove AI message
                 session.memory.chat_memory.messages.pop()  # Remove user message
+                del session.bedrock_messages[-2:]
                 logger.debug(f"Replaced last message pair in session {session_id}")
             elif len(session.memory.chat_memory.messages) == 1:
                 session.memory.chat_memory.messages.pop()  # Remove single message
+                del session.bedrock_messages[-1:]
                 logger.debug(f"Replaced last single message in session {session_id}")
     
         session.memory.chat_memory.add_user_message(human_message)
         session.memory.chat_memory.add_ai_message(ai_message)
+        session.bedrock_messages.append({"role": "user", "content": [{"text": human_message}]})
+        session.bedrock_messages.append({"role": "assistant", "content": [{"text": ai_message}]})
+        # Same window as the LangChain memory: the last k exchanges
+        del session.bedrock_messages[:-2 * getattr(session.memory, "k", 10)]
         session.last_activity = time.time()
+        self.sessions.move_to_end(session_id)
     
         total_messages = len(session.memory.chat_memory.messages)
         logger.debug(f"{'Replaced and added' if replace_last else 'Added'} message pair to session {session_id}. Total messages: {total_messages}")
     
-        logger.debug(f"Human: {human_message[:100]}...")
-        logger.debug(f"AI: {ai_message[:100]}...")
+        logger.opt(lazy=True).debug("Human: {}...", lambda: human_message[:100])
+        logger.opt(lazy=True).debug("AI: {}...", lambda: ai_message[:100])
     
-    @langsmith_service.trace(
-        name="memory_get_chat_history",
-        run_type="retriever",
-        metadata={"operation": "get_history", "service": "memory"}
-    )
     def get_chat_history(self, session_id: str) -> List[BaseMessage]:
         if session_id not in self.sessions:
             logger.debug(f"No session found for {session_id}, returning empty history")
@@ -139,11 +143,6 @@ class ChatMemoryService:
         logger.debug(f"Retrieved {len(messages)} messages for session {session_id}")
         return messages
     
-    @langsmith_service.trace(
-        name="memory_get_variables",
-        run_type="retriever",
-        metadata={"operation": "get_memory_variables", "service": "memory"}
-    )
     def get_memory_variables(self, session_id: str) -> Dict[str, Any]:
         if session_id not in self.sessions:
             logger.debug(f"No session found for {session_id}, returning empty memory variables")
@@ -152,37 +151,20 @@ class ChatMemoryService:
         try:
             memory_vars = self.sessions[session_id].memory.load_memory_variables({})
             chat_history = memory_vars.get("chat_history", [])
-            logger.debug(f"Retrieved memory variables for session {session_id}: {len(chat_history)} messages")
-            
-            for i, msg in enumerate(chat_history):
-                if hasattr(msg, 'type'):
-                    logger.debug(f"Message {i}: type={msg.type}, content={msg.content[:50]}...")
-                else:
-                    logger.debug(f"Message {i}: {type(msg).__name__}")
-            
+            logger.debug("Retrieved memory variables for session {}: {} messages", session_id, len(chat_history))
             return memory_vars
         except Exception as e:
             logger.error(f"Error loading memory variables for session {session_id}: {str(e)}")
             return {"chat_history": []}
     
-    @langsmith_service.trace(
-        name="memory_clear_session",
-        run_type="tool",
-        metadata={"operation": "clear_session", "service": "memory"}
-    )
     def clear_session(self, session_id: str):
         if session_id in self.sessions:
             self.sessions[session_id].memory.clear()
-            del self.sessions[session_id]
+            self._remove_session(session_id)
             logger.info(f"Cleared session: {session_id}")
         else:
             logger.warning(f"Attempted to clear non-existent session: {session_id}")
     
-    @langsmith_service.trace(
-        name="memory_get_session_info",
-        run_type="retriever",
-        metadata={"operation": "get_session_info", "service": "memory"}
-    )
     def get_session_info(self, session_id: str) -> Optional[Dict[str, Any]]:
         if session_id not in self.sessions:
             return None
@@ -193,36 +175,39 @@ class ChatMemoryService:
             "user_id": session.user_id,
             "created_at": session.created_at,
             "last_activity": session.last_activity,
-            "message_count": len(session.memory.chat_memory.messages),
+            "message_count": session.message_count,
             "metadata": session.metadata
         }
     
     def list_active_sessions(self) -> List[str]:
         return list(self.sessions.keys())
     
+    def get_user_sessions(self, user_id: str) -> List[ChatSession]:
+        return [self.sessions[sid] for sid in self._by_user.get(user_id, ())]
+    
+    def _remove_session(self, session_id: str):
+        session = self.sessions.pop(session_id)
+        user_sessions = self._by_user.get(session.user_id)
+        if user_sessions is not None:
+            user_sessions.pop(session_id, None)
+            if not user_sessions:
+                del self._by_user[session.user_id]
+    
     def _cleanup_old_sessions(self):
-        current_time = time.time()
-        expired_sessions = []
+        expire_before = time.time() - self.session_timeout
         
-        for session_id, session in self.sessions.items():
-            if current_time - session.last_activity > self.session_timeout:
-                expired_sessions.append(session_id)
-        
-        for session_id in expired_sessions:
-            del self.sessions[session_id]
+        # Oldest first: stop at the first session that is still fresh
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if session.last_activity >= expire_before:
+                break
+            self._remove_session(session_id)
             logger.info(f"Cleaned up expired session: {session_id}")
         
-        if len(self.sessions) > self.max_sessions:
-            sorted_sessions = sorted(
-                self.sessions.items(), 
-                key=lambda x: x[1].last_activity
-            )
-            
-            to_remove = len(self.sessions) - self.max_sessions
-            for i in range(to_remove):
-                session_id = sorted_sessions[i][0]
-                del self.sessions[session_id]
-                logger.info(f"Removed old session due to limit: {session_id}")
+        while len(self.sessions) > self.max_sessions:
+            session_id = next(iter(self.sessions))
+            self._remove_session(session_id)
+            logger.info(f"Removed old session due to limit: {session_id}")
 
 
 memory_service = ChatMemoryService()
\ No newline at end of file
@@ -1,3 +1,5 @@
+import threading
+import time
 from typing import Dict, List, Optional
 from loguru import logger
 from app.config import settings
@@ -11,10 +13,22 @@ except ImportError:
     raise ImportError("LangSmith is required for prompt management")
 
 
+# LangChain message type -> Bedrock messages-v1 role
+_ROLES = {"human": "user", "ai": "assistant"}
+
+# Bedrock caches the prompt prefix up to this marker, so follow-up turns skip its prefill
+_CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+
 class PromptService:
     def __init__(self):
         self.client = None
         self.prompt_name = getattr(settings, 'LANGSMITH_PROMPT_NAME', None)
+        # Last pulled prompt text; refreshed in the background once it is half a TTL old
+        self._template: Optional[str] = None
+        self._fetched_at = 0.0
+        self._cache_ttl = settings.LANGSMITH_PROMPT_CACHE_TTL
+        self._refresh_lock = threading.Lock()
         
         if not self.prompt_name:
             logger.error("LANGSMITH_PROMPT_NAME not configured!")
@@ -33,6 +47,60 @@ class PromptService:
             raise
     
     def get_prompt(self, context: str = "") -> str:
+        prompt_text = self._get_template()
+        
+        if "{context}" in prompt_text:
+            return prompt_text.replace("{context}", context if context else "")
+        
+        return prompt_text
+    
+    def get_system_blocks(self, context: str = "") -> List[Dict]:
+        """messages-v1 system blocks: the fixed part of the prompt, a cache point, then the KB context.
+        Empty when there is no text at all; callers then leave the system field out"""
+        prefix, placeholder, suffix = self._get_template().partition("{context}")
+        dynamic = f"{context or ''}{suffix}" if placeholder else ""
+        
+        if not prefix.strip():
+            # Nothing request-independent to cache; Bedrock rejects empty text blocks
+            return [{"text": dynamic}] if dynamic.strip() else []
+        
+        blocks = [{"text": prefix}, _CACHE_POINT]
+        if dynamic.strip():
+            blocks.append({"text": dynamic})
+        return blocks
+    
+    def _get_template(self) -> str:
+        prompt_text = self._template
+        
+        if prompt_text is None:
+            # Nothing to serve yet, so the first caller waits for the pull
+            with self._refresh_lock:
+                if self._template is None:
+                    self._store_template(self._pull_template())
+            return self._template
+        
+        if time.monotonic() - self._fetched_at > self._cache_ttl / 2 and self._refresh_lock.acquire(blocking=False):
+            threading.Thread(target=self._refresh_template, name="prompt-refresh", daemon=True).start()
+        
+        return prompt_text
+    
+    def _store_template(self, prompt_text: str):
+        # Trailing whitespace edits in LangSmith would otherwise change the cached prefix
+        self._template = "\n".join(line.rstrip() for line in prompt_text.splitlines())
+        self._fetched_at = time.monotonic()
+    
+    def _refresh_template(self):
+        # Runs with _refresh_lock held; callers keep the current text until this lands
+        try:
+            self._store_template(self._pull_template())
+        except RuntimeError as e:
+            # Serve the last good prompt and try again in a minute rather than on every call
+            logger.warning(f"Keeping cached prompt after failed refresh: {e}")
+            self._fetched_at = time.monotonic() - self._cache_ttl / 2 + 60
+        finally:
+            self._refresh_lock.release()
+    
+    def _pull_template(self) -> str:
 
         try:
             prompt_obj = self.client.pull_prompt(self.prompt_name, include_model=False)
@@ -59,9 +127,6 @@ class PromptService:
             if not prompt_text:
                 raise ValueError("Could not extract prompt text from LangSmith response")
             
-            if "{context}" in prompt_text:
-                return prompt_text.replace("{context}", context if context else "")
-            
             return prompt_text
                 
         except Exception as e:
@@ -72,44 +137,26 @@ class PromptService:
         self,
         query: str,
         chat_history: List,
-        kb_context: str = "",
         max_history: int = 6
     ) -> List[Dict]:
-
+        """History plus the new question; the prompt itself goes in the system field (get_system_blocks)"""
         
-        system_prompt = self.get_prompt(context=kb_context)
-        
-        messages = []
-        recent_history = chat_history[-max_history:] if len(chat_history) > max_history else chat_history
+        recent_history = chat_history[-max_history:]
         
         logger.debug(f"Building messages with {len(recent_history)} history messages")
         
-        # Add chat history
-        for msg in recent_history:
-            if hasattr(msg, 'type'):
-                if msg.type == 'human':
-                    messages.append({
-                        "role": "user", 
-                        "content": [{"text": msg.content}]
-                    })
-                elif msg.type == 'ai':
-                    messages.append({
-                        "role": "assistant", 
-                        "content": [{"text": msg.content}]
-                    })
+        # Add chat history; sessions hand over messages-v1 dicts that need no conversion
+        messages = [
+            msg if isinstance(msg, dict) else {"role": _ROLES[msg.type], "content": [{"text": msg.content}]}
+            for msg in recent_history
+            if isinstance(msg, dict) or getattr(msg, 'type', None) in _ROLES
+        ]
         
-        if messages:
-            messages.append({
-                "role": "user", 
-                "content": [{"text": query}]
-            })
-        else:
-            messages.append({
-                "role": "user", 
-                "content": [{"text": f"{system_prompt}\n\nUser Question: {query}"}]
-            })
+        messages.append({
+            "role": "user", 
+            "content": [{"text": query}]
+        })
         
         return messages
 
-
 prompt_service = PromptService()
\ No newline at end of file
@@ -1,37 +1,91 @@
 # app/services/streaming.py
 
-import json
-from typing import AsyncGenerator, List
+import asyncio
+import hashlib
+import threading
+import anyio.to_thread
+import orjson
+from typing import AsyncGenerator, AsyncIterator, Iterable, List, Optional
 from loguru import logger
+from fastapi.concurrency import run_in_threadpool
 
-from app.services.bedrock_client import get_bedrock_client
+from app.services.bedrock_client import (
+    MAX_STREAM_READERS,
+    get_bedrock_client,
+    get_model_id_or_inference_profile,
+    log_token_usage
+)
 from app.services.langsmith_service import langsmith_service
 from app.services.prompt_service import prompt_service
-from app.core.guardrails import apply_guardrails
-from app.config import settings
+from app.core.cache import TTLCache
+from app.core.guardrails import apply_guardrails_async
+
+
+# Reader tasks are referenced here until they finish so they cannot be collected mid-stream
+_readers = set()
+# Readers hold their thread for a whole generation, so they get their own limiter
+# instead of tokens from the shared threadpool that logins, guardrails and new
+# Bedrock calls wait on. Created on first use, inside the running loop
+_reader_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+def _get_reader_limiter() -> anyio.CapacityLimiter:
+    global _reader_limiter
+    if _reader_limiter is None:
+        _reader_limiter = anyio.CapacityLimiter(MAX_STREAM_READERS)
+    return _reader_limiter
+
+
+async def _iterate_in_thread(iterable: Iterable) -> AsyncIterator:
+    """Consume a blocking iterable on one threadpool worker, handing items to the loop as they arrive"""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    end = object()
+    
+    def drain():
+        try:
+            for item in iterable:
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, end)
+    
+    reader = asyncio.create_task(anyio.to_thread.run_sync(drain, limiter=_get_reader_limiter()))
+    _readers.add(reader)
+    reader.add_done_callback(_readers.discard)
+    try:
+        while True:
+            item = await queue.get()
+            if item is end:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # Closing the stream ends the blocked read now and releases the connection
+        close = getattr(iterable, "close", None)
+        if close is not None and not reader.done():
+            try:
+                close()
+            except Exception as e:
+                logger.debug(f"Closing event stream failed: {e}")
 
 
 class StreamingService:
     
     def __init__(self):
         self.bedrock_client = get_bedrock_client()
-        
-    def _get_model_id_or_inference_profile(self) -> str:
-        region = getattr(settings, 'AWS_REGION', 'us-east-1')
-        custom_model = getattr(settings, 'BEDROCK_GENERATION_MODEL', None)
-        
-        if custom_model and custom_model.startswith(('us.', 'eu.', 'apac.', 'arn:aws:bedrock')):
-            return custom_model
-        
-        if region.startswith('eu-'):
-            return "eu.amazon.nova-pro-v1:0"
-        elif region.startswith('ap-'):
-            return "apac.amazon.nova-pro-v1:0"
-        elif region.startswith('us-'):
-            return "us.amazon.nova-pro-v1:0"
-        else:
-            return "eu.amazon.nova-pro-v1:0"
+        # Guarded answers keyed on the exact request payload; a repeat is served as a single complete event
+        self._response_cache = TTLCache(maxsize=512, ttl=300)
     
+    def clear_cache(self):
+        self._response_cache.clear()
+        
     @langsmith_service.trace(
         name="bedrock_stream_response",
         run_type="llm",
@@ -48,15 +102,13 @@ class StreamingService:
     ) -> AsyncGenerator[dict, None]:
         
         try:
-            # Build messages with KB context injected into prompt
             messages = prompt_service.build_messages_with_history(
                 query=query,
                 chat_history=chat_history,
-                kb_context=kb_context,
                 max_history=6
             )
             
-            model_id = self._get_model_id_or_inference_profile()
+            model_id = get_model_id_or_inference_profile()
             
             body = {
                 "schemaVersion": "messages-v1",
@@ -66,15 +118,37 @@ class StreamingService:
                     "temperature": 0.3
                 }
             }
+            # KB context rides after the cache point, so the prompt prefix stays cacheable
+            system = prompt_service.get_system_blocks(kb_context)
+            if system:
+                body["system"] = system
+            
+            payload = orjson.dumps(body)
+            cache_key = (model_id, hashlib.blake2b(payload, digest_size=16).digest())
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                logger.debug("Cache hit (stream)")
+                yield {
+                    "type": "complete",
+                    "content": cached,
+                    "session_id": session_id
+                }
+                return
             
-            response = self.bedrock_client.invoke_model_with_response_stream(
+            # Both the call and every read from its EventStream block on the
+            # network, so neither runs on the event loop
+            response = await run_in_threadpool(
+                self.bedrock_client.invoke_model_with_response_stream,
                 modelId=model_id,
-                body=json.dumps(body),
+                body=payload,
                 contentType="application/json",
                 accept="application/json"
             )
             
-            full_response = ""
+            # Deltas are joined once at the end rather than concatenated one by one
+            parts: List[str] = []
+            # Guarded answer from messageStop; sent once the trailing metadata (usage) is read
+            final_response = None
             
             stream = response.get('body')
             if not stream:
@@ -85,19 +159,19 @@ class StreamingService:
                 }
                 return
             
-            for event in stream:
+            async for event in _iterate_in_thread(stream):
                 chunk = event.get('chunk')
                 if not chunk:
                     continue
                     
                 try:
-                    chunk_data = json.loads(chunk.get('bytes').decode())
+                    chunk_data = orjson.loads(chunk.get('bytes'))
                     
                     if 'contentBlockDelta' in chunk_data:
                         delta = chunk_data['contentBlockDelta'].get('delta', {})
                         if 'text' in delta:
                             text_chunk = delta['text']
-                            full_response += text_chunk
+                            parts.append(text_chunk)
                             
                             yield {
                                 "type": "chunk",
@@ -106,24 +180,31 @@ class StreamingService:
                             }
                     
                     elif 'messageStop' in chunk_data:
-                        safe_response = apply_guardrails(full_response)
-                        
-                        yield {
-                            "type": "complete",
-                            "content": safe_response,
-                            "session_id": session_id
-                        }
-                        return
+                        final_response = await apply_guardrails_async("".join(parts))
+                        if parts:
+                            self._response_cache.set(cache_key, final_response)
+                    
+                    elif 'metadata' in chunk_data:
+                        # The last event, right behind messageStop. Callers stop reading at
+                        # the complete event, so usage is logged before that goes out
+                        log_token_usage(chunk_data['metadata'].get('usage'))
+                        break
                         
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     continue
                 except Exception as e:
                     logger.error(f"Chunk processing error: {str(e)}")
                     continue
             
             # Stream ended
-            if full_response:
-                safe_response = apply_guardrails(full_response)
+            if final_response is not None:
+                yield {
+                    "type": "complete",
+                    "content": final_response,
+                    "session_id": session_id
+                }
+            elif parts:
+                safe_response = await apply_guardrails_async("".join(parts))
                 yield {
                     "type": "complete",
                     "content": safe_response,
@@ -1,7 +1,11 @@
 import os
 import sys
+import hashlib
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError, NoCredentialsError
 from dotenv import load_dotenv
 import logging
@@ -12,6 +16,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Uploads are network-bound, so files go up side by side on one shared client
+UPLOAD_WORKERS = 16
+# Large PDFs are split into parts uploaded in parallel as well, so the pool
+# needs a connection for every part of every file in flight
+TRANSFER_CONFIG = TransferConfig(multipart_threshold=8 * 1024 * 1024, max_concurrency=4, use_threads=True)
+CLIENT_CONFIG = Config(max_pool_connections=UPLOAD_WORKERS * TRANSFER_CONFIG.max_concurrency)
+
 def load_environment_variables():
     load_dotenv()
     
@@ -41,7 +52,8 @@ def create_s3_client(aws_access_key_id, aws_secret_access_key, aws_region):
             's3',
             aws_access_key_id=aws_access_key_id,
             aws_secret_access_key=aws_secret_access_key,
-            region_name=aws_region
+            region_name=aws_region,
+            config=CLIENT_CONFIG
         )
         # Test the connection
         s3_client.list_buckets()
@@ -62,8 +74,12 @@ def get_pdf_files(folder_path):
         logger.error(f"Folder does not exist: {folder_path}")
         sys.exit(1)
     
-    pdf_files = list(folder.glob("*.pdf"))
-    pdf_files.extend(list(folder.glob("*.PDF")))  # Include uppercase extension
+    # One directory pass; the lowercase check covers .pdf, .PDF and mixed case
+    with os.scandir(folder) as entries:
+        pdf_files = [
+            Path(entry.path) for entry in entries
+            if entry.name.lower().endswith('.pdf') and entry.is_file()
+        ]
     
     if not pdf_files:
         logger.warning(f"No PDF files found in {folder_path}")
@@ -72,11 +88,40 @@ def get_pdf_files(folder_path):
     logger.info(f"Found {len(pdf_files)} PDF files")
     return pdf_files
 
+def file_md5(file_path, chunk_size=1024 * 1024):
+    """Hex MD5 of a file, read in chunks"""
+    digest = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def is_unchanged_in_s3(s3_client, file_path, bucket_name, s3_key, mtime):
+    """True if the object at s3_key already holds this file"""
+    try:
+        head = s3_client.head_object(Bucket=bucket_name, Key=s3_key)
+    except ClientError:
+        # Missing (404) or not readable: upload as usual
+        return False
+    
+    if head.get('Metadata', {}).get('upload_timestamp') == mtime:
+        return True
+    
+    # A plain upload's ETag is the MD5 of its bytes; multipart ETags ("<hash>-<parts>") are not
+    etag = head.get('ETag', '').strip('"')
+    return bool(etag) and '-' not in etag and etag == file_md5(file_path)
+
 def upload_file_to_s3(s3_client, file_path, bucket_name, s3_key):
     """Upload a single file to S3"""
     try:
-        file_size = file_path.stat().st_size
-        logger.info(f"Uploading {file_path.name} ({file_size} bytes) to s3://{bucket_name}/{s3_key}")
+        stat = file_path.stat()
+        mtime = str(int(stat.st_mtime))
+        
+        if is_unchanged_in_s3(s3_client, file_path, bucket_name, s3_key, mtime):
+            logger.info(f"Skipping unchanged {file_path.name}")
+            return True
+        
+        logger.info(f"Uploading {file_path.name} ({stat.st_size} bytes) to s3://{bucket_name}/{s3_key}")
         
         s3_client.upload_file(
             str(file_path),
@@ -86,9 +131,10 @@ def upload_file_to_s3(s3_client, file_path, bucket_name, s3_key):
                 'ContentType': 'application/pdf',
                 'Metadata': {
                     'original_filename': file_path.name,
-                    'upload_timestamp': str(int(Path(file_path).stat().st_mtime))
+                    'upload_timestamp': mtime
                 }
-            }
+            },
+            Config=TRANSFER_CONFIG
         )
         logger.info(f"Successfully uploaded {file_path.name}")
         return True
@@ -125,14 +171,24 @@ def main():
     successful_uploads = 0
     failed_uploads = 0
     
-    for pdf_file in pdf_files:
-        # Create S3 key (path in bucket)
-        s3_key = f"{config['s3_prefix']}{pdf_file.name}"
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+        # S3 key (path in bucket) is the prefix plus the file name
+        futures = [
+            executor.submit(
+                upload_file_to_s3,
+                s3_client,
+                pdf_file,
+                config['bucket_name'],
+                f"{config['s3_prefix']}{pdf_file.name}"
+            )
+            for pdf_file in pdf_files
+        ]
         
-        if upload_file_to_s3(s3_client, pdf_file, config['bucket_name'], s3_key):
-            successful_uploads += 1
-        else:
-            failed_uploads += 1
+        for future in as_completed(futures):
+            if future.result():
+                successful_uploads += 1
+            else:
+                failed_uploads += 1
     
     # Summary
     logger.info(f"Upload complete: {successful_uploads} successful, {failed_uploads} failed")